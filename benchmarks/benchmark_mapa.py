@@ -0,0 +1,229 @@
+"""
+Benchmark do pipeline do mapa (pages/3_map.py).
+
+Gera históricos de leitura sintéticos (de 1 mil a 1 milhão de linhas) com
+nomes de países em português, com acentos, sem acentos, em caixa variada e
+com erros de digitação, e mede separadamente:
+
+- obter_codigo_iso: resolução (a frio) de todos os nomes distintos do log
+- preparar_dados_mapa_livros: agregação por país + códigos ISO
+- add_flag_emoji_column: coluna de bandeiras da tabela por país
+- criar_mapa_livros_mundial: construção da figura coroplética
+
+Roda offline, sem servidor do Streamlit. Cada execução é acrescentada a
+benchmarks/historico_mapa.json e comparada com a anterior, para que
+regressões fiquem visíveis.
+
+Uso:
+    python benchmarks/benchmark_mapa.py
+    python benchmarks/benchmark_mapa.py --tamanhos 1000 10000 --repeticoes 5
+    python benchmarks/benchmark_mapa.py --nao-gravar
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import unidecode
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import paises  # noqa: E402
+from mapa import CAMINHO_COORDENADAS, criar_mapa_livros_mundial, preparar_dados_mapa_livros  # noqa: E402
+from paises import add_flag_emoji_column, invalidar_cache_resolucoes, obter_codigo_iso  # noqa: E402
+
+CAMINHO_HISTORICO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "historico_mapa.json")
+TAMANHOS_PADRAO = [1_000, 10_000, 100_000, 1_000_000]
+
+# Proporção de linhas com o nome do país alterado
+PROPORCAO_VARIACOES = 0.05
+
+
+def _com_erro_de_digitacao(nome, rng):
+    """Troca duas letras vizinhas de lugar, como em um erro de digitação."""
+    if len(nome) < 4:
+        return nome
+    i = int(rng.integers(1, len(nome) - 2))
+    return nome[:i] + nome[i + 1] + nome[i] + nome[i + 2:]
+
+
+def gerar_log_sintetico(n, semente=0):
+    """
+    Gera um histórico de leitura sintético com n livros.
+
+    Os países seguem uma distribuição de cauda longa sobre os nomes de
+    country_coordinates.csv; uma fração das linhas usa variações do nome (sem
+    acentos, em minúsculas ou com erro de digitação).
+
+    Args:
+        n (int): Quantidade de livros
+        semente (int): Semente do gerador aleatório
+
+    Returns:
+        pandas.DataFrame: Colunas 'Título', 'País', 'Nota', 'Páginas' e 'Autor'
+    """
+    rng = np.random.default_rng(semente)
+    nomes = pd.read_csv(CAMINHO_COORDENADAS)['Country'].to_numpy()
+    pesos = 1 / np.arange(1, len(nomes) + 1)
+    paises_log = rng.choice(nomes, size=n, p=pesos / pesos.sum()).astype(object)
+
+    variacoes = np.flatnonzero(rng.random(n) < PROPORCAO_VARIACOES)
+    transformacoes = [
+        unidecode.unidecode,
+        str.lower,
+        lambda nome: _com_erro_de_digitacao(nome, rng),
+    ]
+    for indice, tipo in zip(variacoes, rng.integers(0, len(transformacoes), len(variacoes))):
+        paises_log[indice] = transformacoes[tipo](paises_log[indice])
+
+    return pd.DataFrame({
+        'Título': [f"Livro {i}" for i in range(n)],
+        'País': pd.Categorical(paises_log),
+        'Nota': rng.integers(1, 11, n) / 2,
+        'Páginas': rng.integers(50, 1200, n),
+        'Autor': [f"Autor {i}" for i in rng.integers(0, max(n // 4, 1), n)],
+    })
+
+
+def _cronometrar(funcao, repeticoes, preparar=None):
+    """Executa a função várias vezes e retorna o menor tempo, em segundos."""
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def medir(n, repeticoes):
+    """
+    Mede cada etapa do pipeline do mapa para um log de n linhas.
+
+    Args:
+        n (int): Quantidade de linhas do log sintético
+        repeticoes (int): Repetições por etapa (vale o menor tempo)
+
+    Returns:
+        dict: Tempos em segundos por etapa e tamanho do problema
+    """
+    df = gerar_log_sintetico(n)
+    nomes = df['País'].cat.categories.tolist()
+
+    # Resolução a frio: o lru_cache e o cache persistente são limpos antes de cada repetição
+    tempo_iso = _cronometrar(
+        lambda: [obter_codigo_iso(nome) for nome in nomes],
+        repeticoes,
+        preparar=invalidar_cache_resolucoes
+    )
+
+    # Demais etapas em regime (cache de países já aquecido)
+    df_paises = preparar_dados_mapa_livros(df)
+    tempo_preparacao = _cronometrar(lambda: preparar_dados_mapa_livros(df), repeticoes)
+    tempo_bandeiras = _cronometrar(lambda: add_flag_emoji_column(df_paises, 'Codigo_ISO'), repeticoes)
+    tempo_figura = _cronometrar(lambda: criar_mapa_livros_mundial(df_paises), repeticoes)
+
+    return {
+        'linhas': n,
+        'nomes_distintos': len(nomes),
+        'paises_no_mapa': len(df_paises),
+        'obter_codigo_iso': tempo_iso,
+        'preparar_dados_mapa_livros': tempo_preparacao,
+        'add_flag_emoji_column': tempo_bandeiras,
+        'criar_mapa_livros_mundial': tempo_figura,
+    }
+
+
+ETAPAS = ['obter_codigo_iso', 'preparar_dados_mapa_livros', 'add_flag_emoji_column', 'criar_mapa_livros_mundial']
+
+
+def _commit_atual():
+    """Retorna o commit atual do repositório, se disponível."""
+    try:
+        return subprocess.run(
+            ['git', '-C', RAIZ, 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def carregar_historico(caminho=CAMINHO_HISTORICO):
+    """Lê o histórico de execuções, ou uma lista vazia se ainda não existir."""
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return []
+
+
+def _ultimo_resultado(historico, n):
+    """Resultado mais recente do histórico para um tamanho de log."""
+    for execucao in reversed(historico):
+        for resultado in execucao['resultados']:
+            if resultado['linhas'] == n:
+                return resultado
+    return None
+
+
+def imprimir_resultados(resultados, historico):
+    """Imprime os tempos de cada etapa e a variação em relação à execução anterior."""
+    print(f"{'linhas':>10} {'etapa':<28} {'tempo':>10} {'por linha':>12} {'anterior':>10}")
+    for resultado in resultados:
+        print(f"{resultado['linhas']:>10,} {resultado['nomes_distintos']} nomes distintos, "
+              f"{resultado['paises_no_mapa']} países no mapa")
+        anterior = _ultimo_resultado(historico, resultado['linhas'])
+        for etapa in ETAPAS:
+            tempo = resultado[etapa]
+            variacao = ''
+            if anterior is not None and anterior.get(etapa):
+                variacao = f"{(tempo / anterior[etapa] - 1):+.0%}"
+            print(
+                f"{resultado['linhas']:>10,} {etapa:<28} {tempo * 1000:>8.1f}ms "
+                f"{tempo / resultado['linhas'] * 1e6:>9.2f}us {variacao:>10}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline do mapa de livros.")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO,
+                        help="Quantidades de linhas dos logs sintéticos")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Repetições por etapa (vale o menor tempo)")
+    parser.add_argument('--historico', default=CAMINHO_HISTORICO, help="Arquivo JSON com o histórico de execuções")
+    parser.add_argument('--nao-gravar', action='store_true', help="Não acrescenta a execução ao histórico")
+    args = parser.parse_args()
+
+    # O cache persistente de países fica em um diretório temporário, para não
+    # ler nem alterar o cache real do aplicativo
+    with tempfile.TemporaryDirectory() as diretorio:
+        paises.CAMINHO_CACHE_RESOLUCOES = os.path.join(diretorio, "country_resolutions.json")
+        invalidar_cache_resolucoes()
+        resultados = [medir(n, args.repeticoes) for n in args.tamanhos]
+
+    historico = carregar_historico(args.historico)
+    imprimir_resultados(resultados, historico)
+
+    if not args.nao_gravar:
+        historico.append({
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit_atual(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'repeticoes': args.repeticoes,
+            'resultados': resultados,
+        })
+        with open(args.historico, 'w', encoding='utf-8') as arquivo:
+            json.dump(historico, arquivo, ensure_ascii=False, indent=1)
+
+
+if __name__ == "__main__":
+    main()
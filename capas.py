@@ -0,0 +1,813 @@
+"""
+Busca concorrente das capas dos livros.
+
+As capas vêm da API de livros do RapidAPI (busca por título) e da URL de
+imagem que ela devolve. Os títulos são processados em paralelo por um pool de
+threads que compartilham uma única sessão HTTP (conexões reaproveitadas), com
+um limitador de taxa do tipo token bucket nas chamadas à API, novas tentativas
+com backoff exponencial e um prazo máximo por título.
+
+As capas baixadas ficam em um cache em disco (.cache/capas), endereçado pelo
+hash do título e do autor normalizados. Cada capa é gravada já reduzida para
+uma miniatura WebP; títulos sem capa ficam registrados com um marcador, para
+não serem consultados de novo. O cache tem tamanho máximo e descarta primeiro
+as capas usadas há mais tempo.
+
+Para não bloquear as páginas, a busca de uma biblioteca inteira roda em uma
+thread de segundo plano (BuscaCapas), que preenche o cache em lotes e expõe o
+progresso para a interface.
+
+Nada aqui chama o Streamlit; a URL base da API é configurável para que a busca
+possa ser exercitada contra um servidor HTTP local.
+"""
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from io import BytesIO
+from urllib.parse import quote, urlparse
+
+import requests
+import unidecode
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+URL_BASE_API = os.environ.get("RAPIDAPI_BOOKS_URL", "https://hapi-books.p.rapidapi.com")
+# Sem a chave, a busca de capas fica desativada
+CHAVE_API = os.environ.get("RAPIDAPI_KEY")
+
+# Limites padrão da busca
+TRABALHADORES_PADRAO = 8
+REQUISICOES_POR_SEGUNDO = 2.0
+RAJADA_MAXIMA = 4
+TENTATIVAS = 3
+BACKOFF_INICIAL = 0.5
+TIMEOUT_POR_TITULO = 30.0
+
+# Respostas que valem uma nova tentativa (limite de taxa e falhas do servidor)
+STATUS_REPETIVEIS = {429, 500, 502, 503, 504}
+# Única resposta de erro tratada como "não existe"; as demais (401, 403, ...) são falhas
+STATUS_INEXISTENTE = 404
+
+# Cache em disco das miniaturas
+DIRETORIO_CAPAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "capas")
+LARGURA_MINIATURA = 150
+QUALIDADE_MINIATURA = 80
+TAMANHO_MAXIMO_CACHE = 64 * 1024 * 1024
+# Títulos sem capa voltam a ser consultados depois deste prazo, em segundos
+VALIDADE_AUSENTE = 30 * 24 * 60 * 60
+
+EXTENSAO_CAPA = ".webp"
+EXTENSAO_AUSENTE = ".ausente"
+
+# Retorno de ler_capa_cache para títulos registrados como sem capa
+AUSENTE = b""
+
+# Livros por lote da busca em segundo plano (o cancelamento é verificado entre lotes)
+TAMANHO_LOTE = 32
+# Espera, em segundos, antes de uma busca com falhas ser reagendada sozinha;
+# dobra a cada nova busca com falhas da mesma planilha, até ESPERA_MAXIMA_NOVA_BUSCA
+ESPERA_NOVA_BUSCA = 5 * 60
+ESPERA_MAXIMA_NOVA_BUSCA = 6 * 60 * 60
+
+
+class LimitadorTaxa:
+    """
+    Token bucket compartilhado entre threads: até `rajada` requisições
+    imediatas e, depois disso, `taxa` requisições por segundo.
+    """
+
+    def __init__(self, taxa, rajada=1):
+        self.taxa = taxa
+        self.rajada = rajada
+        self._fichas = float(rajada)
+        self._ultima_reposicao = time.monotonic()
+        self._trava = threading.Lock()
+
+    def _tempo_de_espera(self):
+        """Consome uma ficha se houver; senão, retorna quanto falta para a próxima."""
+        with self._trava:
+            agora = time.monotonic()
+            self._fichas = min(self.rajada, self._fichas + (agora - self._ultima_reposicao) * self.taxa)
+            self._ultima_reposicao = agora
+            if self._fichas >= 1:
+                self._fichas -= 1
+                return 0.0
+            return (1 - self._fichas) / self.taxa
+
+    def adquirir(self, prazo=None):
+        """
+        Bloqueia até haver uma ficha disponível.
+
+        Args:
+            prazo (float | None): Instante (time.monotonic) limite para esperar
+
+        Returns:
+            bool: True se a ficha foi obtida, False se o prazo venceu antes
+        """
+        while True:
+            espera = self._tempo_de_espera()
+            if espera == 0:
+                return True
+            if prazo is not None and time.monotonic() + espera > prazo:
+                return False
+            time.sleep(espera)
+
+
+def criar_sessao(conexoes=TRABALHADORES_PADRAO):
+    """
+    Cria a sessão HTTP compartilhada pelas threads, com um pool de conexões do
+    tamanho do pool de trabalhadores.
+
+    A sessão não leva as credenciais da API: elas vão só nas chamadas à API
+    (ver cabecalhos_api), nunca no download das imagens, que são servidas por
+    outros hosts.
+
+    Args:
+        conexoes (int): Conexões mantidas abertas por host
+
+    Returns:
+        requests.Session: Sessão configurada
+    """
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=conexoes, pool_maxsize=conexoes)
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+    return sessao
+
+
+def cabecalhos_api(url_base=URL_BASE_API, chave_api=CHAVE_API):
+    """
+    Monta os cabeçalhos de autenticação do RapidAPI para as chamadas à API.
+
+    Args:
+        url_base (str): URL base da API de livros
+        chave_api (str): Chave do RapidAPI
+
+    Returns:
+        dict: Cabeçalhos x-rapidapi-key e x-rapidapi-host
+    """
+    return {
+        'x-rapidapi-key': chave_api,
+        'x-rapidapi-host': urlparse(url_base).hostname,
+    }
+
+
+def _espera_retry_after(resposta):
+    """Segundos pedidos pelo servidor no cabeçalho Retry-After, se houver."""
+    try:
+        return float(resposta.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
+
+
+def _requisitar(sessao, url, prazo, limitador=None, cabecalhos=None, tentativas=TENTATIVAS, backoff=BACKOFF_INICIAL):
+    """
+    Faz um GET com novas tentativas e backoff exponencial, sem passar do prazo.
+
+    Cada tentativa consome uma ficha do limitador (se houver), então as novas
+    tentativas também respeitam a taxa da API.
+
+    Args:
+        sessao (requests.Session): Sessão HTTP compartilhada
+        url (str): URL a buscar
+        prazo (float): Instante (time.monotonic) limite para o título
+        limitador (LimitadorTaxa | None): Limitador de taxa a respeitar
+        cabecalhos (dict | None): Cabeçalhos adicionais desta requisição
+        tentativas (int): Número máximo de tentativas
+        backoff (float): Espera antes da segunda tentativa, dobrada a cada nova falha
+
+    Returns:
+        requests.Response | None: Resposta com status 200, ou None se o
+        servidor responder 404
+
+    Raises:
+        TimeoutError: Se o prazo vencer antes de uma resposta definitiva
+        requests.HTTPError: Se o servidor responder com outro status de erro
+            (autenticação, cota, requisição inválida), sem novas tentativas
+        requests.RequestException: Se todas as tentativas falharem
+    """
+    for tentativa in range(tentativas):
+        if limitador is not None and not limitador.adquirir(prazo):
+            raise TimeoutError(f"Prazo esgotado aguardando o limitador: {url}")
+        restante = prazo - time.monotonic()
+        if restante <= 0:
+            raise TimeoutError(f"Prazo esgotado: {url}")
+
+        espera = backoff * 2 ** tentativa
+        try:
+            resposta = sessao.get(url, headers=cabecalhos, timeout=restante)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            erro = e
+        else:
+            if resposta.status_code == 200:
+                return resposta
+            if resposta.status_code == STATUS_INEXISTENTE:
+                return None
+            erro = requests.HTTPError(f"Status {resposta.status_code}: {url}", response=resposta)
+            if resposta.status_code not in STATUS_REPETIVEIS:
+                raise erro
+            espera = _espera_retry_after(resposta) or espera
+
+        if tentativa + 1 == tentativas:
+            raise erro
+        if time.monotonic() + espera >= prazo:
+            raise TimeoutError(f"Prazo esgotado: {url}") from erro
+        time.sleep(espera)
+
+
+def buscar_capa(sessao, titulo, url_base=URL_BASE_API, limitador=None, timeout=TIMEOUT_POR_TITULO, cabecalhos=None):
+    """
+    Busca a capa de um único título: consulta a API e baixa a imagem do
+    primeiro resultado.
+
+    Args:
+        sessao (requests.Session): Sessão HTTP compartilhada
+        titulo (str): Título do livro
+        url_base (str): URL base da API de livros
+        limitador (LimitadorTaxa | None): Limitador de taxa das chamadas à API
+        timeout (float): Prazo total, em segundos, para o título
+        cabecalhos (dict | None): Cabeçalhos da API (ver cabecalhos_api), enviados
+            só na busca, não no download da imagem
+
+    Returns:
+        bytes | None: Conteúdo da imagem, ou None se não houver capa (404, busca
+        sem resultados ou resultado com capa vazia)
+
+    Raises:
+        TimeoutError: Se o prazo do título vencer
+        requests.RequestException: Se a API ou o servidor de imagens falharem
+        ValueError: Se a resposta da API não estiver no formato esperado
+    """
+    prazo = time.monotonic() + timeout
+    consulta = quote(str(titulo).replace(" ", "+"), safe="+")
+    resposta = _requisitar(sessao, f"{url_base.rstrip('/')}/search/{consulta}", prazo, limitador, cabecalhos)
+    if resposta is None:
+        return None
+
+    # Respostas fora do formato esperado são falhas, nunca "sem capa": podem vir
+    # de uma mudança na API ou de uma página de erro servida com status 200
+    try:
+        livros = resposta.json()
+    except ValueError as e:
+        raise ValueError(f"Resposta da API não é JSON para {titulo}") from e
+    if not isinstance(livros, list):
+        raise ValueError(f"Resposta inesperada da API para {titulo}: {str(livros)[:200]}")
+    if not livros:
+        return None
+    if not isinstance(livros[0], dict) or 'cover' not in livros[0]:
+        raise ValueError(f"Resultado sem o campo 'cover' para {titulo}")
+    url_capa = livros[0]['cover']
+    if not url_capa:
+        return None
+
+    # O download da imagem vai para o servidor de imagens, não para a API, e
+    # por isso não consome fichas do limitador nem leva os cabeçalhos da API
+    imagem = _requisitar(sessao, url_capa, prazo)
+    return imagem.content if imagem is not None else None
+
+
+def buscar_capas(
+    titulos,
+    url_base=URL_BASE_API,
+    chave_api=CHAVE_API,
+    trabalhadores=TRABALHADORES_PADRAO,
+    requisicoes_por_segundo=REQUISICOES_POR_SEGUNDO,
+    rajada=RAJADA_MAXIMA,
+    timeout_por_titulo=TIMEOUT_POR_TITULO,
+    ao_concluir=None,
+    sessao=None,
+    limitador=None,
+    executor=None,
+):
+    """
+    Busca as capas de vários títulos em paralelo. Títulos repetidos são
+    buscados uma única vez; uma falha em um título não interrompe os demais.
+
+    Os títulos cuja busca falhou (rede, prazo, erros do servidor) ficam de fora
+    do resultado, para não serem confundidos com títulos sem capa. Sem chave
+    da API a busca fica desativada: nenhum título é consultado e o resultado
+    vem vazio.
+
+    Args:
+        titulos (Iterable[str]): Títulos dos livros
+        url_base (str): URL base da API de livros
+        chave_api (str): Chave do RapidAPI
+        trabalhadores (int): Quantidade de threads
+        requisicoes_por_segundo (float): Taxa sustentada de chamadas à API
+        rajada (int): Chamadas à API permitidas de imediato
+        timeout_por_titulo (float): Prazo total, em segundos, de cada título
+        ao_concluir (Callable[[str, bytes | None], None] | None): Chamada na
+            thread de busca assim que cada título é resolvido, com o título e
+            o conteúdo da imagem (não é chamada para os títulos que falharem)
+        sessao (requests.Session | None): Sessão a reaproveitar (ver criar_sessao);
+            se None, uma sessão é criada e fechada nesta chamada
+        limitador (LimitadorTaxa | None): Limitador a reaproveitar, para que a
+            taxa valha entre chamadas; se None, um novo é criado com
+            requisicoes_por_segundo e rajada
+        executor (ThreadPoolExecutor | None): Pool de threads a reaproveitar; se
+            None, um pool de `trabalhadores` threads é criado nesta chamada
+
+    Returns:
+        dict[str, bytes | None]: Conteúdo da imagem por título (None se não houver capa)
+    """
+    if not chave_api:
+        print("Aviso: RAPIDAPI_KEY não definida; a busca de capas está desativada.")
+        return {}
+
+    falhou = object()
+    titulos_unicos = list(dict.fromkeys(titulos))
+    cabecalhos = cabecalhos_api(url_base, chave_api)
+    if limitador is None:
+        limitador = LimitadorTaxa(requisicoes_por_segundo, rajada)
+
+    def buscar(titulo):
+        try:
+            capa = buscar_capa(sessao, titulo, url_base, limitador, timeout_por_titulo, cabecalhos)
+        except Exception as e:
+            print(f"Erro ao buscar a capa de {titulo}: {e}")
+            return falhou
+        if ao_concluir is not None:
+            ao_concluir(titulo, capa)
+        return capa
+
+    # Só fecha a sessão e o pool que forem criados aqui
+    with ExitStack() as recursos:
+        if sessao is None:
+            sessao = recursos.enter_context(criar_sessao(trabalhadores))
+        if executor is None:
+            executor = recursos.enter_context(ThreadPoolExecutor(max_workers=trabalhadores))
+        resultados = zip(titulos_unicos, executor.map(buscar, titulos_unicos))
+        return {titulo: capa for titulo, capa in resultados if capa is not falhou}
+
+
+def normalizar_texto(texto):
+    """
+    Normaliza um título ou autor para compor a chave do cache: sem acentos, em
+    minúsculas, com pontuação trocada por espaços e espaços repetidos removidos.
+
+    Args:
+        texto (str | None): Texto a normalizar
+
+    Returns:
+        str: Texto normalizado (vazio para valores ausentes)
+    """
+    if texto is None or texto != texto:
+        return ""
+    sem_acentos = unidecode.unidecode(str(texto)).lower()
+    return ' '.join(re.sub(r"[^a-z0-9]+", ' ', sem_acentos).split())
+
+
+def chave_capa(titulo, autor=None):
+    """
+    Calcula a chave de cache de uma capa a partir do título e do autor.
+
+    Args:
+        titulo (str): Título do livro
+        autor (str | None): Autor do livro
+
+    Returns:
+        str: Hash SHA-256 hexadecimal do título e autor normalizados
+    """
+    identidade = f"{normalizar_texto(titulo)}|{normalizar_texto(autor)}"
+    return hashlib.sha256(identidade.encode('utf-8')).hexdigest()
+
+
+def caminho_capa(chave):
+    """Retorna o caminho da miniatura de uma capa no cache."""
+    return os.path.join(DIRETORIO_CAPAS, f"{chave}{EXTENSAO_CAPA}")
+
+
+def _caminho_ausente(chave):
+    """Retorna o caminho do marcador de capa inexistente."""
+    return os.path.join(DIRETORIO_CAPAS, f"{chave}{EXTENSAO_AUSENTE}")
+
+
+def gerar_miniatura(conteudo, largura=LARGURA_MINIATURA):
+    """
+    Reduz uma imagem para a largura da miniatura, mantendo a proporção, e a
+    codifica em WebP.
+
+    Args:
+        conteudo (bytes): Imagem original em qualquer formato suportado pelo Pillow
+        largura (int): Largura máxima da miniatura, em pixels
+
+    Returns:
+        bytes: Miniatura em WebP
+    """
+    with Image.open(BytesIO(conteudo)) as imagem:
+        # Em JPEGs, decodifica direto em escala reduzida (1/2, 1/4 ou 1/8)
+        imagem.draft('RGB', (largura, largura * imagem.height // max(imagem.width, 1)))
+        imagem = imagem.convert('RGBA' if 'A' in imagem.getbands() else 'RGB')
+        if imagem.width > largura:
+            altura = max(1, round(imagem.height * largura / imagem.width))
+            imagem = imagem.resize((largura, altura), Image.LANCZOS)
+        saida = BytesIO()
+        imagem.save(saida, format='WEBP', quality=QUALIDADE_MINIATURA)
+    return saida.getvalue()
+
+
+def _gravar_arquivo(destino, conteudo):
+    """Grava em um arquivo temporário e o renomeia, para nunca deixar o cache incompleto."""
+    os.makedirs(DIRETORIO_CAPAS, exist_ok=True)
+    temporario = f"{destino}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, destino)
+
+
+def ler_capa_cache(chave):
+    """
+    Lê a miniatura de uma capa do cache e a marca como usada agora.
+
+    Args:
+        chave (str): Chave da capa (ver chave_capa)
+
+    Returns:
+        bytes | None: Miniatura em WebP; AUSENTE se o título estiver registrado
+        como sem capa; None se a capa ainda não tiver sido buscada
+    """
+    caminho = caminho_capa(chave)
+    try:
+        with open(caminho, 'rb') as arquivo:
+            conteudo = arquivo.read()
+        # A data de modificação é a "última utilização" usada pelo descarte LRU
+        os.utime(caminho)
+        return conteudo
+    except OSError:
+        pass
+
+    try:
+        registrado_em = os.path.getmtime(_caminho_ausente(chave))
+    except OSError:
+        return None
+    if time.time() - registrado_em > VALIDADE_AUSENTE:
+        return None
+    return AUSENTE
+
+
+def carregar_miniatura(chave):
+    """
+    Lê a miniatura de uma capa para exibição, sem decodificá-la: os bytes WebP
+    vão direto para o navegador.
+
+    Args:
+        chave (str | None): Chave da capa (ver chave_capa)
+
+    Returns:
+        bytes | None: Miniatura em WebP, ou None se não houver capa no cache
+    """
+    if not chave:
+        return None
+    return ler_capa_cache(chave) or None
+
+
+def gravar_capa_cache(chave, conteudo):
+    """
+    Grava a miniatura de uma capa no cache, ou o marcador de capa inexistente.
+
+    Args:
+        chave (str): Chave da capa (ver chave_capa)
+        conteudo (bytes | None): Imagem original, ou None se o título não tiver capa
+
+    Returns:
+        bytes: Miniatura gravada, ou AUSENTE se o título não tiver capa
+
+    Raises:
+        OSError: Se o cache não puder ser gravado ou a imagem não puder ser
+            decodificada (nesse caso nada é gravado)
+        ValueError: Se a imagem for inválida
+        PIL.Image.DecompressionBombError: Se a imagem for grande demais
+    """
+    if conteudo is None:
+        _gravar_arquivo(_caminho_ausente(chave), b"")
+        return AUSENTE
+    miniatura = gerar_miniatura(conteudo)
+    _gravar_arquivo(caminho_capa(chave), miniatura)
+    try:
+        os.remove(_caminho_ausente(chave))
+    except OSError:
+        pass
+    return miniatura
+
+
+def reduzir_cache(tamanho_maximo=TAMANHO_MAXIMO_CACHE):
+    """
+    Descarta as miniaturas usadas há mais tempo até o cache caber no tamanho
+    máximo. Os marcadores de capa inexistente são vazios e não contam.
+
+    Args:
+        tamanho_maximo (int): Tamanho máximo do cache, em bytes
+
+    Returns:
+        int: Quantidade de miniaturas removidas
+    """
+    try:
+        with os.scandir(DIRETORIO_CAPAS) as entradas:
+            miniaturas = [
+                (entrada.stat().st_mtime, entrada.stat().st_size, entrada.path)
+                for entrada in entradas if entrada.name.endswith(EXTENSAO_CAPA)
+            ]
+    except OSError:
+        return 0
+
+    tamanho_total = sum(tamanho for _, tamanho, _ in miniaturas)
+    removidas = 0
+    for _, tamanho, caminho in sorted(miniaturas):
+        if tamanho_total <= tamanho_maximo:
+            break
+        try:
+            os.remove(caminho)
+        except OSError:
+            continue
+        tamanho_total -= tamanho
+        removidas += 1
+    return removidas
+
+
+def buscar_capas_com_cache(livros, ao_concluir=None, **opcoes_busca):
+    """
+    Obtém as miniaturas das capas de vários livros, consultando primeiro o
+    cache em disco. Só os livros ainda desconhecidos (nem capa nem marcador de
+    ausência válido) são buscados na API; cada resultado é gravado no cache
+    assim que chega, e o cache é reduzido ao tamanho máximo ao final.
+
+    Args:
+        livros (Iterable[tuple[str, str | None]]): Pares (título, autor)
+        ao_concluir (Callable[[str, bytes | None], None] | None): Chamada com a
+            chave e a miniatura (None se não houver capa) de cada livro
+            resolvido, vindo do cache ou da API; pode ser chamada de outras threads
+        **opcoes_busca: Opções repassadas a buscar_capas (url_base, trabalhadores, ...)
+
+    Returns:
+        dict[str, bytes | None]: Miniatura em WebP por chave de capa (None se o
+        livro não tiver capa); livros cuja busca falhou ficam de fora
+    """
+    livros_por_chave = {chave_capa(titulo, autor): titulo for titulo, autor in livros}
+
+    miniaturas = {}
+    chaves_pendentes = {}
+    for chave, titulo in livros_por_chave.items():
+        conteudo = ler_capa_cache(chave)
+        if conteudo is None:
+            # O mesmo título com autores diferentes é buscado uma única vez
+            chaves_pendentes.setdefault(titulo, []).append(chave)
+            continue
+        miniaturas[chave] = conteudo or None
+        if ao_concluir is not None:
+            ao_concluir(chave, miniaturas[chave])
+
+    def guardar(titulo, conteudo):
+        for chave in chaves_pendentes[titulo]:
+            try:
+                miniaturas[chave] = gravar_capa_cache(chave, conteudo) or None
+            except (OSError, ValueError, Image.DecompressionBombError) as e:
+                # Imagem inválida ou cache sem gravação: conta como falha e é tentada de novo
+                print(f"Não foi possível gravar a capa de {titulo} no cache: {e}")
+                continue
+            if ao_concluir is not None:
+                ao_concluir(chave, miniaturas[chave])
+
+    if chaves_pendentes:
+        buscar_capas(chaves_pendentes, ao_concluir=guardar, **opcoes_busca)
+        reduzir_cache()
+
+    return miniaturas
+
+
+class BuscaCapas:
+    """
+    Busca em segundo plano das capas de uma biblioteca. Os livros são
+    processados em lotes por buscar_capas_com_cache; cada capa vai para o
+    cache e para o progresso assim que chega, e o cancelamento é verificado
+    entre os lotes. A sessão HTTP, o limitador de taxa e o pool de threads são
+    criados uma vez por busca e compartilhados por todos os lotes, então as
+    conexões são reaproveitadas e a taxa vale para a busca inteira. O progresso
+    pode ser lido de qualquer thread com progresso().
+    """
+
+    NA_FILA = "na fila"
+    EM_ANDAMENTO = "em andamento"
+    CONCLUIDA = "concluída"
+    CANCELADA = "cancelada"
+
+    def __init__(self, livros, chave_planilha=None, tamanho_lote=TAMANHO_LOTE, tentativa=0, **opcoes_busca):
+        # Um livro por chave de capa, na ordem da planilha, sem títulos vazios
+        self.livros = list({
+            chave_capa(titulo, autor): (titulo, autor)
+            for titulo, autor in livros if normalizar_texto(titulo)
+        }.items())
+        self.chave_planilha = chave_planilha
+        self.tamanho_lote = tamanho_lote
+        self.opcoes_busca = opcoes_busca
+        # Quantas buscas seguidas desta planilha terminaram com falhas antes desta
+        self.tentativa = tentativa
+        self.estado = self.NA_FILA
+        self.concluida_em = None
+        self._contagens = {'com_capa': 0, 'sem_capa': 0, 'falhas': 0}
+        self._trava = threading.Lock()
+        self._cancelada = threading.Event()
+
+    def _registrar(self, chave, miniatura):
+        """Soma ao progresso um livro resolvido; chamado pelas threads de busca."""
+        with self._trava:
+            self._contagens['sem_capa' if miniatura is None else 'com_capa'] += 1
+
+    def executar(self):
+        """Processa todos os livros; chamado pela thread de segundo plano."""
+        if self._cancelada.is_set():
+            return
+        self.estado = self.EM_ANDAMENTO
+
+        # Os livros já resolvidos no cache contam de imediato e não entram nos lotes
+        pendentes = []
+        for chave, livro in self.livros:
+            conteudo = ler_capa_cache(chave)
+            if conteudo is None:
+                pendentes.append((chave, livro))
+            else:
+                self._registrar(chave, conteudo or None)
+
+        opcoes = dict(self.opcoes_busca)
+        trabalhadores = opcoes.pop('trabalhadores', TRABALHADORES_PADRAO)
+        limitador = LimitadorTaxa(
+            opcoes.pop('requisicoes_por_segundo', REQUISICOES_POR_SEGUNDO),
+            opcoes.pop('rajada', RAJADA_MAXIMA)
+        )
+        with criar_sessao(trabalhadores) as sessao, ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+            for inicio in range(0, len(pendentes), self.tamanho_lote):
+                if self._cancelada.is_set():
+                    self.estado = self.CANCELADA
+                    return
+                lote = pendentes[inicio:inicio + self.tamanho_lote]
+                try:
+                    miniaturas = buscar_capas_com_cache(
+                        (livro for _, livro in lote), ao_concluir=self._registrar,
+                        sessao=sessao, limitador=limitador, executor=executor, **opcoes
+                    )
+                except Exception as e:
+                    print(f"Erro na busca de capas em segundo plano: {e}")
+                    miniaturas = {}
+                # Os livros que não voltaram do lote falharam e serão tentados na próxima busca
+                with self._trava:
+                    self._contagens['falhas'] += sum(chave not in miniaturas for chave, _ in lote)
+
+        self.concluir()
+
+    def concluir(self):
+        """Marca a busca como concluída e registra o instante, para o backoff."""
+        self.concluida_em = time.monotonic()
+        self.estado = self.CONCLUIDA
+
+    def pode_reagendar(self):
+        """
+        Indica se a busca pode ser reagendada automaticamente: só se terminou
+        com falhas e já passou a espera, que dobra a cada nova busca com falhas.
+
+        Returns:
+            bool: True se uma nova busca pode ser agendada sem ação do usuário
+        """
+        if self.estado != self.CONCLUIDA or not self.progresso()['falhas']:
+            return False
+        espera = min(ESPERA_NOVA_BUSCA * 2 ** self.tentativa, ESPERA_MAXIMA_NOVA_BUSCA)
+        return time.monotonic() - self.concluida_em >= espera
+
+    def cancelar(self):
+        """Interrompe a busca ao final do lote atual."""
+        self._cancelada.set()
+        if self.estado == self.NA_FILA:
+            self.estado = self.CANCELADA
+
+    @property
+    def ativa(self):
+        """True enquanto a busca estiver na fila ou em andamento."""
+        return self.estado in (self.NA_FILA, self.EM_ANDAMENTO)
+
+    def progresso(self):
+        """
+        Retorna um retrato do progresso da busca.
+
+        Returns:
+            dict: 'estado', 'total', 'concluidos' e as contagens 'com_capa',
+            'sem_capa' e 'falhas'
+        """
+        with self._trava:
+            contagens = dict(self._contagens)
+        return {
+            'estado': self.estado,
+            'total': len(self.livros),
+            'concluidos': sum(contagens.values()),
+            **contagens,
+        }
+
+
+# Buscas por chave de planilha e a fila atendida por uma única thread de
+# segundo plano, para que buscas de planilhas diferentes não somem suas taxas
+_buscas = {}
+_trava_buscas = threading.Lock()
+_fila_buscas = queue.Queue()
+_trabalhador = None
+
+
+def _atender_fila():
+    """Executa as buscas da fila, uma de cada vez."""
+    while True:
+        busca = _fila_buscas.get()
+        try:
+            busca.executar()
+        except Exception as e:
+            print(f"Erro na busca de capas em segundo plano: {e}")
+            busca.concluir()
+
+
+def iniciar_busca_capas(chave_planilha, livros, forcar=False, **opcoes_busca):
+    """
+    Agenda a busca em segundo plano das capas de uma planilha e retorna sem
+    esperar por nenhuma requisição. Uma nova busca só reconsulta na API os
+    livros que ainda não estão no cache.
+
+    Se a planilha já tiver uma busca, ela é reaproveitada enquanto estiver
+    ativa, se tiver terminado sem falhas ou se tiver sido cancelada. Uma busca
+    com falhas só é reagendada sozinha depois da espera de
+    BuscaCapas.pode_reagendar, para que recarregar a página com a API fora do
+    ar não reenvie a biblioteca inteira a cada interação; com forcar=True (ação
+    explícita do usuário) é reagendada na hora.
+
+    Args:
+        chave_planilha (str): Hash da planilha
+        livros (Iterable[tuple[str, str | None]]): Pares (título, autor)
+        forcar (bool): Se True, reagenda a busca mesmo dentro da espera,
+            desde que ela não esteja ativa
+        **opcoes_busca: Opções repassadas a buscar_capas (url_base, trabalhadores, ...)
+
+    Returns:
+        BuscaCapas | None: Busca agendada, em andamento ou reaproveitada, ou
+        None se a busca de capas estiver desativada (sem chave da API)
+    """
+    global _trabalhador
+    if not opcoes_busca.get('chave_api', CHAVE_API):
+        print("Aviso: RAPIDAPI_KEY não definida; a busca de capas está desativada.")
+        return None
+
+    with _trava_buscas:
+        anterior = _buscas.get(chave_planilha)
+        tentativa = 0
+        if anterior is not None:
+            if anterior.ativa or not (forcar or anterior.pode_reagendar()):
+                return anterior
+            if anterior.progresso()['falhas']:
+                tentativa = anterior.tentativa + 1
+
+        busca = BuscaCapas(livros, chave_planilha=chave_planilha, tentativa=tentativa, **opcoes_busca)
+        _buscas[chave_planilha] = busca
+        _fila_buscas.put(busca)
+
+        # Thread daemon: não segura o encerramento do servidor
+        if _trabalhador is None or not _trabalhador.is_alive():
+            _trabalhador = threading.Thread(target=_atender_fila, name="busca-capas", daemon=True)
+            _trabalhador.start()
+        return busca
+
+
+def reagendar_busca_capas(chave_planilha):
+    """
+    Reagenda na hora a busca de capas de uma planilha, com os mesmos livros e
+    opções da busca anterior. Pensada para um botão da interface.
+
+    Args:
+        chave_planilha (str): Hash da planilha
+
+    Returns:
+        BuscaCapas | None: Nova busca, a anterior se ainda estiver ativa, ou
+        None se a planilha não tiver busca
+    """
+    anterior = obter_busca_capas(chave_planilha)
+    if anterior is None:
+        return None
+    livros = [livro for _, livro in anterior.livros]
+    return iniciar_busca_capas(
+        chave_planilha, livros, forcar=True, tamanho_lote=anterior.tamanho_lote, **anterior.opcoes_busca
+    )
+
+
+def busca_capas_habilitada():
+    """Indica se há chave da API configurada para buscar capas."""
+    return bool(CHAVE_API)
+
+
+def obter_busca_capas(chave_planilha):
+    """
+    Retorna a busca de capas mais recente de uma planilha.
+
+    Args:
+        chave_planilha (str | None): Hash da planilha
+
+    Returns:
+        BuscaCapas | None: Busca da planilha, ou None se nenhuma foi iniciada
+    """
+    with _trava_buscas:
+        return _buscas.get(chave_planilha)
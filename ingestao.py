@@ -0,0 +1,319 @@
+"""
+Ingestão das planilhas de leitura (.xlsm).
+
+Cada planilha é identificada por um hash do seu conteúdo (ou do caminho e da
+data de modificação, no caso do arquivo local padrão). Na primeira carga a
+planilha é lida via openpyxl, validada e "compilada" em um snapshot colunar
+(Arrow/Feather, sem compressão) com os tipos já convertidos. As cargas
+seguintes do mesmo conteúdo, em qualquer processo, leem o snapshot do disco
+em vez de reabrir o Excel. O nome do snapshot inclui a versão do esquema, e
+os menos usados são descartados quando o diretório passa do tamanho máximo.
+"""
+import hashlib
+import json
+import os
+from importlib.metadata import version
+from io import BytesIO
+
+import pandas as pd
+import pyarrow.feather as feather
+import streamlit as st
+
+CAMINHO_ARQUIVO_LOCAL = "Book1.xlsm"
+
+# Diretório dos snapshots compilados, um arquivo .feather por hash de planilha e versão
+DIRETORIO_SNAPSHOTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "snapshots")
+EXTENSAO_SNAPSHOT = ".feather"
+TAMANHO_MAXIMO_SNAPSHOTS = 256 * 1024 * 1024
+# Incrementar sempre que converter_tipos mudar o resultado para a mesma planilha
+ESQUEMA_SNAPSHOT = 1
+
+COLUNAS_OBRIGATORIAS = [
+    "Título", "Gênero", "Ficção", "País", "Região", "Autor", "Editora",
+    "Ano de Publicação", "Séc", "Sexo Autor", "Etnia", "Páginas", "Conclusão", "Nota"
+]
+
+# Tipos aplicados na compilação do snapshot
+COLUNAS_CATEGORICAS = ["Gênero", "País", "Região", "Etnia", "Sexo Autor"]
+COLUNAS_NUMERICAS = ["Páginas", "Nota", "Ano de Publicação"]
+COLUNAS_DATA = ["Conclusão"]
+COLUNAS_TEXTO = ["Título", "Autor", "Editora"]
+
+
+def _versao_snapshot():
+    """
+    Identifica a versão dos snapshots: muda quando o esquema, as colunas
+    tipadas ou as versões do pandas/pyarrow mudam, para que snapshots antigos
+    nunca sejam lidos com tipos de outra versão.
+    """
+    conteudo = json.dumps(
+        [
+            ESQUEMA_SNAPSHOT, version('pandas'), version('pyarrow'), COLUNAS_OBRIGATORIAS,
+            COLUNAS_CATEGORICAS, COLUNAS_NUMERICAS, COLUNAS_DATA, COLUNAS_TEXTO
+        ],
+        sort_keys=True
+    )
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:16]
+
+
+VERSAO_SNAPSHOT = _versao_snapshot()
+
+
+def hash_conteudo(dados):
+    """
+    Calcula o hash SHA-256 dos bytes de uma planilha.
+
+    Args:
+        dados (bytes): Conteúdo do arquivo
+
+    Returns:
+        str: Hash hexadecimal do conteúdo
+    """
+    return hashlib.sha256(dados).hexdigest()
+
+
+def hash_arquivo_local(caminho):
+    """
+    Calcula o hash de um arquivo local a partir do caminho, da data de
+    modificação e do tamanho, sem precisar ler o arquivo inteiro.
+
+    Args:
+        caminho (str): Caminho do arquivo
+
+    Returns:
+        str: Hash hexadecimal que identifica a versão do arquivo
+
+    Raises:
+        FileNotFoundError: Se o arquivo não existir
+    """
+    info = os.stat(caminho)
+    identificador = f"{os.path.abspath(caminho)}|{info.st_mtime_ns}|{info.st_size}"
+    return hashlib.sha256(identificador.encode("utf-8")).hexdigest()
+
+
+def validar_planilha(df):
+    """
+    Verifica se a planilha tem todas as colunas obrigatórias.
+
+    Args:
+        df (pandas.DataFrame): DataFrame lido da planilha
+
+    Raises:
+        ValueError: Se alguma coluna estiver faltando
+    """
+    colunas_faltando = [col for col in COLUNAS_OBRIGATORIAS if col not in df.columns]
+    if colunas_faltando:
+        raise ValueError(f"As seguintes colunas estão faltando: {colunas_faltando}")
+
+
+def converter_tipos(df):
+    """
+    Converte as colunas da planilha para os tipos do snapshot: categorias para
+    os campos repetitivos, datetime para a conclusão e numérico para páginas,
+    nota e ano de publicação.
+
+    Args:
+        df (pandas.DataFrame): DataFrame lido da planilha
+
+    Returns:
+        pandas.DataFrame: Novo DataFrame com os tipos convertidos
+    """
+    df_tipado = df.copy()
+
+    for coluna in COLUNAS_DATA:
+        df_tipado[coluna] = pd.to_datetime(df_tipado[coluna], errors='coerce')
+
+    for coluna in COLUNAS_NUMERICAS:
+        df_tipado[coluna] = pd.to_numeric(df_tipado[coluna], errors='coerce')
+
+    # Títulos como "1984" chegam do Excel como inteiros
+    for coluna in COLUNAS_TEXTO:
+        valores = df_tipado[coluna]
+        df_tipado[coluna] = valores.where(valores.isna(), valores.astype(str))
+
+    for coluna in COLUNAS_CATEGORICAS:
+        df_tipado[coluna] = df_tipado[coluna].astype('category')
+
+    return df_tipado
+
+
+def remover_categorias_vazias(df):
+    """
+    Remove as categorias sem ocorrências de todas as colunas categóricas, para
+    que value_counts e groupby de um recorte não listem valores ausentes.
+
+    Args:
+        df (pandas.DataFrame): DataFrame (possivelmente filtrado)
+
+    Returns:
+        pandas.DataFrame: DataFrame sem categorias vazias
+    """
+    colunas = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    if not colunas:
+        return df
+    df_limpo = df.copy()
+    for coluna in colunas:
+        df_limpo[coluna] = df_limpo[coluna].cat.remove_unused_categories()
+    return df_limpo
+
+
+def caminho_snapshot(chave):
+    """Retorna o caminho do snapshot compilado de uma planilha na versão atual."""
+    return os.path.join(DIRETORIO_SNAPSHOTS, f"{chave}.{VERSAO_SNAPSHOT}{EXTENSAO_SNAPSHOT}")
+
+
+def reduzir_snapshots(tamanho_maximo=TAMANHO_MAXIMO_SNAPSHOTS, preservar=None):
+    """
+    Descarta os snapshots usados há mais tempo até o diretório caber no
+    tamanho máximo. Snapshots de outras versões nunca são lidos, então
+    envelhecem e saem primeiro.
+
+    Args:
+        tamanho_maximo (int): Tamanho máximo do diretório, em bytes
+        preservar (str | None): Caminho de um snapshot que não deve ser removido
+
+    Returns:
+        int: Quantidade de snapshots removidos
+    """
+    try:
+        with os.scandir(DIRETORIO_SNAPSHOTS) as entradas:
+            snapshots = [
+                (entrada.stat().st_mtime, entrada.stat().st_size, entrada.path)
+                for entrada in entradas if entrada.name.endswith(EXTENSAO_SNAPSHOT)
+            ]
+    except OSError:
+        return 0
+
+    tamanho_total = sum(tamanho for _, tamanho, _ in snapshots)
+    removidos = 0
+    for _, tamanho, caminho in sorted(snapshots):
+        if tamanho_total <= tamanho_maximo:
+            break
+        if caminho == preservar:
+            continue
+        try:
+            os.remove(caminho)
+        except OSError:
+            continue
+        tamanho_total -= tamanho
+        removidos += 1
+    return removidos
+
+
+def compilar_snapshot(df, chave):
+    """
+    Valida a planilha, converte os tipos e grava o snapshot colunar em disco.
+    A gravação é feita em um arquivo temporário e renomeada ao final, para que
+    outros processos nunca leiam um snapshot incompleto; em seguida os
+    snapshots menos usados são descartados se o diretório passar do limite.
+
+    Args:
+        df (pandas.DataFrame): DataFrame lido da planilha
+        chave (str): Hash da planilha
+
+    Returns:
+        pandas.DataFrame: DataFrame tipado que foi gravado
+
+    Raises:
+        ValueError: Se alguma coluna obrigatória estiver faltando
+    """
+    validar_planilha(df)
+    df_tipado = converter_tipos(df)
+
+    os.makedirs(DIRETORIO_SNAPSHOTS, exist_ok=True)
+    destino = caminho_snapshot(chave)
+    temporario = f"{destino}.{os.getpid()}.tmp"
+    # Sem compressão para que a leitura não precise descompactar o arquivo
+    feather.write_feather(df_tipado.reset_index(drop=True), temporario, compression='uncompressed')
+    os.replace(temporario, destino)
+    reduzir_snapshots(preservar=destino)
+
+    return df_tipado
+
+
+def ler_snapshot(chave):
+    """
+    Lê um snapshot compilado. O arquivo é aberto com memory-map, o que evita
+    lê-lo para um buffer intermediário, mas to_pandas copia as colunas para a
+    memória do processo: o DataFrame não compartilha páginas com o arquivo nem
+    com outros processos.
+
+    Args:
+        chave (str): Hash da planilha
+
+    Returns:
+        pandas.DataFrame: DataFrame tipado, ou None se o snapshot não existir
+    """
+    caminho = caminho_snapshot(chave)
+    try:
+        tabela = feather.read_table(caminho, memory_map=True)
+    except FileNotFoundError:
+        # Inexistente ou descartado por outro processo
+        return None
+    df = tabela.to_pandas()
+    try:
+        # A data de modificação é a "última utilização" usada pelo descarte LRU
+        os.utime(caminho)
+    except OSError:
+        pass
+    return df
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def carregar_snapshot(chave, _origem=None):
+    """
+    Retorna o DataFrame tipado de uma planilha, compilando o snapshot a partir
+    de `_origem` apenas quando ele ainda não existe em disco. O resultado fica
+    em cache indexado apenas pela chave (`_origem` não entra no hash).
+
+    Args:
+        chave (str): Hash da planilha
+        _origem (str | BytesIO): Caminho ou conteúdo da planilha original
+
+    Returns:
+        pandas.DataFrame: DataFrame tipado
+
+    Raises:
+        FileNotFoundError: Se não houver snapshot nem planilha de origem
+    """
+    df = ler_snapshot(chave)
+    if df is not None:
+        return df
+    if _origem is None:
+        raise FileNotFoundError(f"Snapshot '{chave}' não encontrado.")
+    return compilar_snapshot(pd.read_excel(_origem), chave)
+
+
+def carregar_arquivo_enviado(arquivo):
+    """
+    Carrega uma planilha enviada pelo usuário, reaproveitando o snapshot quando
+    o mesmo conteúdo já foi compilado antes.
+
+    Args:
+        arquivo (UploadedFile): Arquivo retornado por st.file_uploader
+
+    Returns:
+        tuple[pandas.DataFrame, str]: DataFrame tipado e hash do conteúdo
+    """
+    dados = arquivo.getvalue()
+    chave = hash_conteudo(dados)
+    return carregar_snapshot(chave, BytesIO(dados)), chave
+
+
+def carregar_arquivo_local(caminho=CAMINHO_ARQUIVO_LOCAL):
+    """
+    Carrega a planilha local padrão, reaproveitando o snapshot enquanto o
+    arquivo não for modificado.
+
+    Args:
+        caminho (str): Caminho da planilha local
+
+    Returns:
+        tuple[pandas.DataFrame, str]: DataFrame tipado e hash do arquivo
+
+    Raises:
+        FileNotFoundError: Se o arquivo não existir
+    """
+    chave = hash_arquivo_local(caminho)
+    return carregar_snapshot(chave, caminho), chave
+
@@ -1,5 +1,7 @@
 import streamlit as st
-import pandas as pd
+from capas import iniciar_busca_capas
+from ingestao import CAMINHO_ARQUIVO_LOCAL, carregar_arquivo_enviado, carregar_arquivo_local
+from modelo_dados import registrar_planilha_na_sessao
 st.set_page_config(page_title="skoob", page_icon="📚")
 st.title("Visualizador de Arquivo Excel (.xlsm)")
 
@@ -19,19 +21,25 @@ with col2:
 
 # Handle file loading
 if uploaded_file is not None:
-    df = pd.read_excel(uploaded_file)
-    st.session_state['df_livros'] = df
-    st.success("Arquivo carregado com sucesso!")
-    st.dataframe(df)
+    try:
+        df, chave = carregar_arquivo_enviado(uploaded_file)
+        registrar_planilha_na_sessao(df, chave)
+        # Capas em segundo plano: a página de retrospectiva mostra as que já chegaram
+        iniciar_busca_capas(chave, zip(df['Título'], df['Autor']))
+        st.success("Arquivo carregado com sucesso!")
+        st.dataframe(df)
+    except ValueError as e:
+        st.error(f"Planilha inválida: {str(e)}")
 elif use_local_file:
     try:
-        local_file_path = "Book1.xlsm"
-        df = pd.read_excel(local_file_path)
-        st.session_state['df_livros'] = df
+        df, chave = carregar_arquivo_local()
+        registrar_planilha_na_sessao(df, chave)
+        # Capas em segundo plano: a página de retrospectiva mostra as que já chegaram
+        iniciar_busca_capas(chave, zip(df['Título'], df['Autor']))
         st.success("Arquivo local carregado com sucesso!")
         st.dataframe(df)
     except FileNotFoundError:
-        st.error("Arquivo local 'Book1 (3).xlsm' não encontrado. Verifique se o arquivo está no diretório correto.")
+        st.error(f"Arquivo local '{CAMINHO_ARQUIVO_LOCAL}' não encontrado. Verifique se o arquivo está no diretório correto.")
     except Exception as e:
         st.error(f"Erro ao carregar o arquivo local: {str(e)}")
 
@@ -0,0 +1,464 @@
+"""
+Agregações geográficas usadas pela página do mapa.
+
+As funções daqui trabalham só com pandas (sem chamadas ao Streamlit), para
+poderem ser reaproveitadas e medidas fora da página.
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from paises import (
+    CONTINENTE_DESCONHECIDO, add_flag_emoji_column, adicionar_colunas_paises, obter_codigo_iso, resolver_pais
+)
+
+# Coordenadas (lat/lon) por nome de país em português, para o mapa de pontos
+CAMINHO_COORDENADAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "country_coordinates.csv")
+
+# Estatísticas extras por país: coluna de saída -> (coluna de origem, agregação)
+ESTATISTICAS_EXTRAS = {
+    'Nota_Media': ('Nota', 'mean'),
+    'Total_Paginas': ('Páginas', 'sum'),
+    'Quantidade_Autores': ('Autor', 'nunique'),
+}
+
+
+def agregar_livros_por_pais(df_livros, estatisticas_extras=False, coluna='País'):
+    """
+    Agrega os livros por país em uma única passada vetorizada: quantidade de
+    livros, maior nota e o título do livro com a maior nota.
+
+    O livro de maior nota de cada país é a primeira linha do país em um frame
+    ordenado por nota decrescente (ordenação estável, então empates ficam com o
+    primeiro livro da planilha, como no idxmax). As demais colunas saem de um
+    único groupby com agregações nomeadas.
+
+    Ao agrupar por outra coluna (por exemplo 'Codigo_ISO'), grafias diferentes
+    do mesmo país viram uma única linha, e a coluna 'País' recebe a grafia
+    mais frequente do grupo.
+
+    Args:
+        df_livros (pandas.DataFrame): DataFrame de livros com as colunas 'País' e 'Nota'
+        estatisticas_extras (bool): Se True, inclui também nota média, total
+            de páginas e quantidade de autores (ver ESTATISTICAS_EXTRAS)
+        coluna (str): Coluna que identifica o país no agrupamento; linhas com
+            valor nulo nela ficam de fora
+
+    Returns:
+        pandas.DataFrame: Uma linha por país, com as colunas 'País',
+        'Quantidade_Livros', 'Livro_Maior_Nota' e 'Maior_Nota' (e as extras,
+        e a própria coluna de agrupamento, se não for 'País')
+    """
+    agregacoes = {'Quantidade_Livros': ('Nota', 'size'), 'Maior_Nota': ('Nota', 'max')}
+    if estatisticas_extras:
+        agregacoes.update({
+            nome: agregacao for nome, agregacao in ESTATISTICAS_EXTRAS.items()
+            if agregacao[0] in df_livros.columns
+        })
+    df_paises = df_livros.groupby(coluna, observed=True, sort=True).agg(**agregacoes)
+
+    if 'Título' in df_livros.columns:
+        ordenado = df_livros[[coluna, 'Título', 'Nota']].sort_values('Nota', ascending=False, kind='stable')
+        livros_top = ordenado.dropna(subset=[coluna]).drop_duplicates(coluna).set_index(coluna)['Título']
+        df_paises.insert(1, 'Livro_Maior_Nota', livros_top.reindex(df_paises.index))
+    else:
+        df_paises.insert(1, 'Livro_Maior_Nota', 'N/A')
+
+    if coluna == 'País':
+        return df_paises.reset_index()
+
+    # Grafia mais frequente de cada país (empates ficam com a primeira da planilha)
+    grafias = df_livros.groupby([coluna, 'País'], observed=True, sort=False).size()
+    grafias = grafias.sort_values(ascending=False, kind='stable').reset_index().drop_duplicates(coluna)
+    df_paises.insert(0, 'País', grafias.set_index(coluna)['País'].astype(object).reindex(df_paises.index))
+    return df_paises.reset_index().pipe(lambda df: df[[c for c in df.columns if c != coluna] + [coluna]])
+
+
+@lru_cache(maxsize=1)
+def carregar_coordenadas(caminho=CAMINHO_COORDENADAS):
+    """
+    Lê country_coordinates.csv uma única vez como índice nome → coordenadas.
+
+    Args:
+        caminho (str): Caminho do CSV com as colunas Country, Latitude e Longitude
+
+    Returns:
+        pandas.DataFrame: Latitude e Longitude indexadas pelo nome do país
+    """
+    return pd.read_csv(caminho).drop_duplicates('Country').set_index('Country')[['Latitude', 'Longitude']]
+
+
+@lru_cache(maxsize=1)
+def _coordenadas_por_iso3(caminho=CAMINHO_COORDENADAS):
+    """Índice ISO-3 → coordenadas, usado só para nomes que não estão no CSV."""
+    coordenadas = carregar_coordenadas(caminho)
+    codigos = coordenadas.index.map(obter_codigo_iso)
+    return coordenadas[codigos.notna()].set_axis(codigos[codigos.notna()]).groupby(level=0).first()
+
+
+def adicionar_coordenadas(df_paises):
+    """
+    Adiciona latitude e longitude a cada país. Nomes presentes no CSV de
+    coordenadas são resolvidos por consulta direta, sem código ISO; apenas os
+    demais passam pela resolução de países.
+
+    Args:
+        df_paises (pandas.DataFrame): DataFrame com a coluna 'País'
+
+    Returns:
+        pandas.DataFrame: Cópia com as colunas 'Latitude' e 'Longitude'
+        (NaN para países sem coordenadas)
+    """
+    coordenadas = carregar_coordenadas()
+    resultado = df_paises.copy()
+    nomes = resultado['País'].astype(object)
+    resultado['Latitude'] = nomes.map(coordenadas['Latitude']).astype(float)
+    resultado['Longitude'] = nomes.map(coordenadas['Longitude']).astype(float)
+
+    faltando = resultado['Latitude'].isna()
+    if faltando.any():
+        por_iso3 = _coordenadas_por_iso3()
+        codigos = nomes[faltando].map(lambda pais: resolver_pais(pais)['iso3'])
+        resultado.loc[faltando, 'Latitude'] = codigos.map(por_iso3['Latitude']).astype(float)
+        resultado.loc[faltando, 'Longitude'] = codigos.map(por_iso3['Longitude']).astype(float)
+    return resultado
+
+
+def preparar_dados_mapa_pontos(df_livros, estatisticas_extras=False):
+    """
+    Prepara dados de livros para o mapa de pontos, que posiciona cada país
+    pelas coordenadas de country_coordinates.csv em vez do código ISO.
+
+    Args:
+        df_livros (pandas.DataFrame): DataFrame com as colunas 'País' e 'Nota'
+        estatisticas_extras (bool): Se True, inclui nota média, total de
+            páginas e quantidade de autores por país
+
+    Returns:
+        pandas.DataFrame: DataFrame agregado por país com Latitude e Longitude
+
+    Raises:
+        ValueError: Se alguma coluna necessária estiver faltando
+    """
+    colunas_necessarias = ['País', 'Nota']
+    for coluna in colunas_necessarias:
+        if coluna not in df_livros.columns:
+            raise ValueError(f"Coluna '{coluna}' não encontrada no DataFrame")
+
+    df_paises = adicionar_coordenadas(agregar_livros_por_pais(df_livros, estatisticas_extras))
+    # Remover países sem coordenadas
+    return df_paises.dropna(subset=['Latitude', 'Longitude'])
+
+
+def preparar_dados_mapa_livros(df_livros, estatisticas_extras=False):
+    """
+    Prepara dados de livros para visualização no mapa mundial.
+
+    Args:
+        df_livros (pandas.DataFrame): DataFrame original com informações dos livros
+            Colunas esperadas:
+            - País: Nome do país de publicação
+            - Nota: Nota do livro
+            - Título ou colunas adicionais que identifiquem o livro
+        estatisticas_extras (bool): Se True, inclui nota média, total de
+            páginas e quantidade de autores por país
+
+    Returns:
+        pandas.DataFrame: DataFrame agregado com informações por país
+
+    Raises:
+        ValueError: Se alguma coluna necessária estiver faltando
+    """
+    # Verificar colunas necessárias
+    colunas_necessarias = ['País', 'Nota']
+    for coluna in colunas_necessarias:
+        if coluna not in df_livros.columns:
+            raise ValueError(f"Coluna '{coluna}' não encontrada no DataFrame")
+
+    # O frame preparado já traz o código ISO resolvido no carregamento da
+    # planilha; só frames crus passam pela resolução em lote aqui
+    if 'Codigo_ISO' not in df_livros.columns:
+        df_livros = adicionar_colunas_paises(df_livros)
+
+    # Agrupar pelo código ISO: países sem código ficam de fora, e grafias
+    # diferentes do mesmo país somam na mesma linha do mapa
+    df_paises = agregar_livros_por_pais(df_livros, estatisticas_extras, coluna='Codigo_ISO')
+    df_paises['Codigo_ISO'] = df_paises['Codigo_ISO'].astype(object)
+    return df_paises
+
+
+# Aparência do globo compartilhada pelos dois tipos de mapa
+GEO_MAPA = dict(
+    showframe=False,
+    showcoastlines=True,
+    projection_type='equirectangular',
+    showcountries=True,
+    countrycolor='rgba(128, 128, 128, 0.3)',  # Cor mais suave para as bordas
+    coastlinecolor='rgba(128, 128, 128, 0.3)',
+    showland=True,
+    landcolor='rgba(250, 250, 250, 0.95)'
+)
+
+TITULO_MAPA = {
+    'text': 'Publicações de Livros por País',
+    'y': 0.95,
+    'x': 0.5,
+    'xanchor': 'center',
+    'yanchor': 'top',
+    'font': {'size': 24}
+}
+
+
+def criar_mapa_livros_mundial(df_paises):
+    """
+    Cria mapa mundial de livros por país com bandeiras no hover e escala de cores suavizada
+
+    Parâmetros:
+    df_paises (pandas.DataFrame): DataFrame agregado de livros por país
+
+    Retorna:
+    plotly.graph_objs.Figure: Mapa mundi interativo com bandeiras
+    """
+
+    def normalize_with_log(series):
+        """
+        Normaliza os valores usando log para suavizar outliers
+        """
+        # Adiciona 1 para evitar log(0)
+        log_values = np.log1p(series)
+        # Normaliza para [0,1]
+        return (log_values - log_values.min()) / (log_values.max() - log_values.min())
+
+    # Adiciona emojis de bandeira
+    df_paises = add_flag_emoji_column(df_paises, 'Codigo_ISO')
+    # Normaliza a quantidade de livros usando log scale
+    df_paises['normalized_books'] = normalize_with_log(df_paises['Quantidade_Livros'])
+
+    # Crie o mapa coroplético
+    fig = px.choropleth(
+        df_paises,
+        locations="Codigo_ISO",
+        color="Quantidade_Livros",
+        hover_name="flag",
+        hover_data={
+            'normalized_books': False,  # Esconde a coluna normalizada
+            'País': True,
+            'Quantidade_Livros': True,
+            'Maior_Nota': ':.1f',
+            'Livro_Maior_Nota': True,
+            'flag': False,
+            'Codigo_ISO': False
+        },
+        color_continuous_scale='YlOrRd',  # Usa uma escala de azuis mais suave
+        labels={'normalized_books': 'Quantidade de Livros', 'Maior_Nota': 'Maior Nota', 'Livro_Maior_Nota': 'Livro com a maior nota','Quantidade_Livros': 'Quantidade de livros'}  # Renomeia a legenda
+    )
+
+    # Personalize o layout
+    fig.update_layout(
+        title=TITULO_MAPA,
+        geo=GEO_MAPA,
+        height=600,
+        width=1000,
+        margin=dict(l=0, r=0, t=50, b=0)
+    )
+
+    # Atualiza a barra de cores
+    fig.update_coloraxes(
+        colorbar_title="Quantidade<br>de Livros",
+        colorbar_thickness=15,
+        colorbar_len=0.7,
+        colorbar_title_font_size=12,
+        colorbar_tickfont_size=10,
+        showscale=True
+    )
+
+    return fig
+
+
+def criar_mapa_livros_pontos(df_paises):
+    """
+    Cria um mapa de pontos (bolhas) com um marcador por país, posicionado pelas
+    coordenadas do CSV. Não envia a geometria de cada país na figura, só um
+    ponto, então é mais leve que o mapa coroplético.
+
+    Args:
+        df_paises (pandas.DataFrame): DataFrame de preparar_dados_mapa_pontos
+
+    Returns:
+        plotly.graph_objs.Figure: Mapa mundi de pontos
+    """
+    quantidades = df_paises['Quantidade_Livros'].to_numpy(dtype=float)
+    # Área da bolha proporcional à quantidade de livros
+    tamanhos = 8 + 32 * np.sqrt(quantidades / quantidades.max()) if len(quantidades) else []
+
+    fig = go.Figure(go.Scattergeo(
+        lat=df_paises['Latitude'],
+        lon=df_paises['Longitude'],
+        mode='markers',
+        marker=dict(
+            size=tamanhos,
+            color=quantidades,
+            colorscale='YlOrRd',
+            line=dict(width=0.5, color='rgba(60, 60, 60, 0.6)'),
+            colorbar=dict(
+                title=dict(text="Quantidade<br>de Livros", font=dict(size=12)),
+                thickness=15,
+                len=0.7,
+                tickfont=dict(size=10)
+            )
+        ),
+        customdata=df_paises[['País', 'Livro_Maior_Nota', 'Maior_Nota']].astype(object).to_numpy(),
+        hovertemplate=(
+            "<b>%{customdata[0]}</b><br>"
+            "Quantidade de livros: %{marker.color:.0f}<br>"
+            "Maior Nota: %{customdata[2]:.1f}<br>"
+            "Livro com a maior nota: %{customdata[1]}<extra></extra>"
+        )
+    ))
+
+    fig.update_layout(
+        title=TITULO_MAPA,
+        geo=GEO_MAPA,
+        height=600,
+        width=1000,
+        margin=dict(l=0, r=0, t=50, b=0)
+    )
+    return fig
+
+
+# Níveis do cubo geográfico, do mais geral ao mais detalhado
+NIVEIS_CUBO = ['Continente', 'Região', 'País']
+# Valor dos níveis vazios no cubo (ex.: país sem continente), para que esses
+# livros continuem somando nos totais
+NIVEL_DESCONHECIDO = CONTINENTE_DESCONHECIDO
+
+# Medidas do cubo e como cada uma é consolidada nos níveis superiores
+MEDIDAS_CUBO = {
+    'Quantidade_Livros': 'sum',
+    'Total_Paginas': 'sum',
+    'Soma_Notas': 'sum',
+    'Quantidade_Notas': 'sum',
+    'Maior_Nota': 'max',
+}
+
+
+def construir_cubo_geografico(df_livros):
+    """
+    Pré-agrega os livros em um cubo (Ano, Continente, Região, País) com
+    quantidade de livros, total de páginas e estatísticas de nota. Qualquer
+    nível da hierarquia, em qualquer intervalo de anos, sai do cubo sem
+    reagrupar o frame original.
+
+    Usa a coluna 'Continente' do modelo de dados quando ela existe; senão, o
+    continente é resolvido uma vez por país distinto (via cache de países).
+    Níveis vazios viram NIVEL_DESCONHECIDO, para que os totais do cubo batam
+    com a quantidade de livros do frame.
+
+    Args:
+        df_livros (pandas.DataFrame): DataFrame preparado, com as colunas
+            'Ano', 'País', 'Região', 'Nota' e 'Páginas'
+
+    Returns:
+        pandas.DataFrame: Uma linha por combinação (Ano, Continente, Região, País)
+    """
+    base = df_livros if 'Continente' in df_livros.columns else adicionar_colunas_paises(df_livros)
+
+    niveis_preenchidos = {}
+    for nivel in NIVEIS_CUBO:
+        coluna = base[nivel]
+        if not coluna.isna().any():
+            continue
+        if isinstance(coluna.dtype, pd.CategoricalDtype) and NIVEL_DESCONHECIDO not in coluna.cat.categories:
+            coluna = coluna.cat.add_categories(NIVEL_DESCONHECIDO)
+        niveis_preenchidos[nivel] = coluna.fillna(NIVEL_DESCONHECIDO)
+    if niveis_preenchidos:
+        base = base.assign(**niveis_preenchidos)
+
+    return base.groupby(['Ano'] + NIVEIS_CUBO, observed=True).agg(
+        Quantidade_Livros=('Nota', 'size'),
+        Total_Paginas=('Páginas', 'sum'),
+        Soma_Notas=('Nota', 'sum'),
+        Quantidade_Notas=('Nota', 'count'),
+        Maior_Nota=('Nota', 'max')
+    ).reset_index()
+
+
+def consultar_cubo(cubo, nivel, ano_inicio=None, ano_fim=None, filtros=None):
+    """
+    Consolida o cubo geográfico até um nível da hierarquia.
+
+    Args:
+        cubo (pandas.DataFrame): Cubo de construir_cubo_geografico
+        nivel (str): 'Continente', 'Região' ou 'País'
+        ano_inicio (int): Ano inicial (opcional)
+        ano_fim (int): Ano final (opcional)
+        filtros (dict): Valores fixos de níveis superiores, ex. {'Continente': 'Europe'}
+
+    Returns:
+        pandas.DataFrame: Uma linha por item do nível (com os níveis acima),
+        com 'Quantidade_Livros', 'Total_Paginas', 'Nota_Media' e 'Maior_Nota',
+        ordenado pela quantidade de livros
+    """
+    fatia = cubo
+    if ano_inicio is not None and ano_fim is not None:
+        fatia = fatia[fatia['Ano'].between(ano_inicio, ano_fim)]
+    for coluna, valor in (filtros or {}).items():
+        fatia = fatia[fatia[coluna] == valor]
+
+    chaves = NIVEIS_CUBO[:NIVEIS_CUBO.index(nivel) + 1]
+    consolidado = fatia.groupby(chaves, observed=True).agg(MEDIDAS_CUBO).reset_index()
+    consolidado['Nota_Media'] = consolidado['Soma_Notas'] / consolidado['Quantidade_Notas']
+    return (
+        consolidado.drop(columns=['Soma_Notas', 'Quantidade_Notas'])
+        .sort_values('Quantidade_Livros', ascending=False, ignore_index=True)
+    )
+
+
+def criar_sunburst_geografico(cubo, ano_inicio=None, ano_fim=None):
+    """
+    Cria um gráfico sunburst continente → região → país a partir do cubo.
+    Clicar em um setor aproxima aquele ramo (e clicar no centro volta um nível).
+
+    Args:
+        cubo (pandas.DataFrame): Cubo de construir_cubo_geografico
+        ano_inicio (int): Ano inicial (opcional)
+        ano_fim (int): Ano final (opcional)
+
+    Returns:
+        plotly.graph_objs.Figure: Gráfico sunburst
+    """
+    ids, rotulos, pais, valores, dados = [], [], [], [], []
+    for profundidade, nivel in enumerate(NIVEIS_CUBO):
+        consolidado = consultar_cubo(cubo, nivel, ano_inicio, ano_fim)
+        caminhos = consolidado[NIVEIS_CUBO[:profundidade + 1]].astype(str).agg('/'.join, axis=1)
+        ids += caminhos.tolist()
+        rotulos += consolidado[nivel].astype(str).tolist()
+        pais += (caminhos.str.rsplit('/', n=1).str[0] if profundidade else pd.Series('', index=caminhos.index)).tolist()
+        valores += consolidado['Quantidade_Livros'].tolist()
+        dados += consolidado[['Total_Paginas', 'Nota_Media', 'Maior_Nota']].to_numpy().tolist()
+
+    fig = go.Figure(go.Sunburst(
+        ids=ids,
+        labels=rotulos,
+        parents=pais,
+        values=valores,
+        branchvalues='total',
+        customdata=dados,
+        hovertemplate=(
+            "<b>%{label}</b><br>"
+            "Livros: %{value}<br>"
+            "Páginas: %{customdata[0]:,.0f}<br>"
+            "Nota média: %{customdata[1]:.2f}<br>"
+            "Maior nota: %{customdata[2]:.1f}<extra></extra>"
+        )
+    ))
+    fig.update_layout(
+        title={**TITULO_MAPA, 'text': 'Livros por Continente, Região e País'},
+        height=600,
+        margin=dict(l=0, r=0, t=50, b=0)
+    )
+    return fig
@@ -0,0 +1,118 @@
+"""
+Modelo de dados compartilhado pelas páginas.
+
+O DataFrame de livros é preparado uma única vez por planilha a partir do
+snapshot já tipado pela ingestão (linhas sem data de conclusão removidas,
+colunas derivadas de data calculadas e países resolvidos em código ISO e
+continente) e mantido em cache no processo, indexado pelo hash da planilha.
+As páginas recebem cópias rasas desse frame. Com o copy-on-write do pandas 3
+(versão mínima em requirements.txt), qualquer alteração feita por uma página,
+inclusive no lugar, gera uma cópia local e nunca afeta o frame compartilhado.
+"""
+import streamlit as st
+
+from ingestao import carregar_snapshot, remover_categorias_vazias
+from paises import adicionar_colunas_paises
+
+
+def preparar_dados_para_analise(df):
+    """
+    Prepara o DataFrame para análise, calculando as colunas derivadas de data
+    e resolvendo os países (em lote, uma vez por nome distinto) nas colunas
+    'Codigo_ISO' e 'Continente'. Os tipos não são convertidos de novo: o frame
+    já vem tipado do snapshot (ver ingestao.converter_tipos).
+
+    Args:
+        df (pandas.DataFrame): DataFrame tipado da planilha
+
+    Returns:
+        pandas.DataFrame: Novo DataFrame preparado
+    """
+    # Remove linhas com datas de conclusão inválidas
+    df_preparado = df.dropna(subset=['Conclusão'])
+
+    conclusao = df_preparado['Conclusão']
+    df_preparado['Ano'] = conclusao.dt.year
+    df_preparado['Mês'] = conclusao.dt.month
+    df_preparado['Mês Conclusão'] = conclusao.dt.to_period('M')
+    df_preparado['Trimestre'] = conclusao.dt.quarter
+    df_preparado['Década'] = (df_preparado['Ano de Publicação'] // 10) * 10
+    df_preparado = adicionar_colunas_paises(df_preparado)
+
+    return remover_categorias_vazias(df_preparado)
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def _carregar_frame_preparado(chave, _df=None):
+    """
+    Prepara o frame de uma planilha uma única vez por processo. O cache é
+    indexado apenas pelo hash da planilha (`_df` não entra no hash); o frame
+    tipado só é lido do snapshot quando não há frame preparado em cache e
+    `_df` não foi informado.
+    """
+    if _df is None:
+        _df = carregar_snapshot(chave)
+    return preparar_dados_para_analise(_df)
+
+
+def invalidar_frames_preparados():
+    """
+    Descarta os frames preparados de todas as planilhas, para que as colunas
+    derivadas (como 'Codigo_ISO' e 'Continente') sejam recalculadas na
+    próxima leitura, por exemplo depois de limpar o cache de países.
+    """
+    _carregar_frame_preparado.clear()
+
+
+def registrar_planilha_na_sessao(df, chave):
+    """
+    Registra a planilha carregada na sessão e já prepara o frame compartilhado,
+    para que a conversão de tipos aconteça no carregamento e não nas páginas.
+
+    Args:
+        df (pandas.DataFrame): DataFrame tipado da planilha
+        chave (str): Hash da planilha
+    """
+    st.session_state['df_livros'] = df
+    st.session_state['hash_livros'] = chave
+    _carregar_frame_preparado(chave, df)
+
+
+def obter_dados():
+    """
+    Retorna uma cópia rasa do DataFrame preparado da planilha ativa. O frame
+    preparado é buscado pelo hash da planilha; a planilha tipada só é lida
+    quando ele ainda não está em cache.
+
+    Returns:
+        pandas.DataFrame: DataFrame preparado, ou None se nenhuma planilha foi carregada
+    """
+    chave = st.session_state.get('hash_livros')
+    df_sessao = st.session_state.get('df_livros')
+    if chave is None:
+        return None if df_sessao is None else preparar_dados_para_analise(df_sessao)
+    try:
+        df_preparado = _carregar_frame_preparado(chave)
+    except FileNotFoundError:
+        # Snapshot descartado do disco: prepara a partir do frame da sessão
+        if df_sessao is None:
+            return None
+        df_preparado = _carregar_frame_preparado(chave, df_sessao)
+    # Cópia rasa: compartilha os dados e, com copy-on-write, isola as alterações da página
+    return df_preparado.copy(deep=False)
+
+
+def filtrar_livros_por_anos(df, anos_selecionados):
+    """
+    Filtra livros para os anos selecionados.
+
+    Args:
+        df (pandas.DataFrame): DataFrame preparado
+        anos_selecionados (List[int]): Anos selecionados para análise
+
+    Returns:
+        pandas.DataFrame: DataFrame filtrado
+    """
+    df_filtrado = df[df['Ano'].isin(anos_selecionados)]
+    return remover_categorias_vazias(df_filtrado)
+
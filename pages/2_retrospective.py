@@ -2,29 +2,28 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from PIL import Image
-from io import BytesIO
-import requests
-import time
 from typing import List
 import numpy as np
 import math
 # Paleta de cores para os gráficos
 cores_graficos = px.colors.qualitative.Pastel
-import http.client
+from capas import (
+    LARGURA_MINIATURA, busca_capas_habilitada, buscar_capas_com_cache, carregar_miniatura, chave_capa,
+    obter_busca_capas, reagendar_busca_capas
+)
+from modelo_dados import filtrar_livros_por_anos, obter_dados
 
 
-from datetime import datetime
 def load_data():
     """
-    Carrega os dados do session_state.
+    Carrega uma cópia rasa dos dados preparados da planilha ativa; com o
+    copy-on-write do pandas 3, alterações feitas pela página ficam só nela.
     Retorna None se os dados não estiverem disponíveis.
     """
-    if 'df_livros' in st.session_state:
-        return st.session_state['df_livros']
-    else:
+    df = obter_dados()
+    if df is None:
         st.error("Por favor, carregue os dados na página principal primeiro.")
-        return None
+    return df
     
 
 def criar_estrelas(df, coluna_notas):
@@ -59,109 +58,271 @@ def criar_estrelas(df, coluna_notas):
     
     return df_copy
 
-def assign_frames(df, date_column):
+# Número máximo de frames das animações de linha do tempo. Acima dele, os
+# livros são agrupados por dia, semana ou mês (a menor granularidade que caiba)
+ORCAMENTO_FRAMES = 200
+
+GRANULARIDADES_FRAMES = [('D', 'dia'), ('W', 'semana'), ('M', 'mês')]
+
+
+def numerar_frames(datas, orcamento_frames=ORCAMENTO_FRAMES):
     """
-    Creates a 'frames' column in a DataFrame assigning frame numbers based on date order.
-    
-    Parameters:
-    df (pandas.DataFrame): Input DataFrame
-    date_column (str): Name of the date column to use for ordering
-    
+    Atribui um número de frame a cada livro respeitando o orçamento de frames.
+    Dentro do orçamento, cada livro tem o seu frame; acima dele, os livros são
+    agrupados pela menor granularidade (dia, semana ou mês) que caiba, e se nem
+    os meses couberem, meses consecutivos são reunidos no mesmo frame.
+
+    Args:
+        datas (numpy.ndarray): Datas de conclusão, em ordem crescente
+        orcamento_frames (int): Número máximo de frames
+
     Returns:
-    pandas.DataFrame: DataFrame with new 'frames' column
+        tuple[numpy.ndarray, str | None]: Número do frame de cada livro (a partir
+        de 1, não decrescente) e a granularidade usada, ou None se não houve agrupamento
     """
-    # Make a copy to avoid modifying the original DataFrame
-    df_copy = df.copy()
-    
-    # Sort the DataFrame by date
-    df_copy = df_copy.sort_values(by=date_column)
-    
-    # Create frames column starting from 1 to length of DataFrame
-    df_copy['frames'] = range(1, len(df_copy) + 1)
-    
-    # Return the DataFrame sorted back to its original order
-    return df_copy.sort_index()
+    n = len(datas)
+    orcamento_frames = max(int(orcamento_frames), 1)
+    if n <= orcamento_frames:
+        return np.arange(1, n + 1), None
+
+    indice = pd.DatetimeIndex(datas)
+    for frequencia, granularidade in GRANULARIDADES_FRAMES:
+        # Datas ordenadas geram códigos de período já em ordem crescente
+        codigos = pd.factorize(indice.to_period(frequencia))[0]
+        if codigos[-1] + 1 <= orcamento_frames:
+            return codigos + 1, granularidade
+
+    meses_por_frame = math.ceil((codigos[-1] + 1) / orcamento_frames)
+    return codigos // meses_por_frame + 1, f"{meses_por_frame} meses"
+
+
+def _grupos_frames(numeros_frames):
+    """Divide as posições dos livros em grupos consecutivos com o mesmo número de frame."""
+    inicios = np.flatnonzero(np.diff(numeros_frames)) + 1
+    return np.split(np.arange(len(numeros_frames)), inicios)
+
+
+def _legenda_agrupamento(granularidade, numeros_frames):
+    """Informa o agrupamento aplicado, quando o orçamento de frames foi excedido."""
+    if granularidade is not None:
+        st.caption(f"Animação com {numeros_frames[-1]} frame(s): livros agrupados por {granularidade}.")
 
-def criar_timeline_animada_combinada(df):
+
+def construir_frames_incrementais(x, y, textos, cores, marcador, linha, numeros_frames=None):
+    """
+    Constrói uma animação incremental: cada frame tem um trace próprio (o
+    segmento que liga os seus livros ao último livro do frame anterior) que
+    começa vazio, e o frame k envia apenas os dados desse trace, indicado em
+    `traces=[k]`. O navegador recebe cada livro uma única vez, e o payload
+    cresce em O(n) em vez de O(n²).
+
+    Args:
+        x (numpy.ndarray): Posições no eixo x, já ordenadas
+        y (numpy.ndarray): Posições no eixo y
+        textos (numpy.ndarray): Rótulo de cada livro
+        cores (numpy.ndarray): Cor (ou valor na escala de cores) de cada livro
+        marcador (dict): Estilo dos marcadores; 'size' é o tamanho do ponto revelado
+        linha (dict): Estilo da linha que liga os pontos
+        numeros_frames (numpy.ndarray): Número do frame de cada livro (ver
+            numerar_frames); por padrão, um frame por livro
+
+    Returns:
+        tuple[list[go.Scatter], list[go.Frame]]: Traces iniciais (vazios) e frames
+    """
+    if numeros_frames is None:
+        numeros_frames = np.arange(1, len(x) + 1)
+    grupos = _grupos_frames(numeros_frames)
+    n = len(grupos)
+    tamanho = marcador.get('size', 15)
+    traces = [
+        go.Scatter(
+            x=[],
+            y=[],
+            mode='lines+markers+text',
+            line=linha,
+            # Apenas o primeiro trace exibe a barra de cores, se houver
+            marker=dict(marcador, showscale=marcador.get('showscale', False) and i == 0),
+            textposition="top center",
+            hoverinfo='text',
+            showlegend=False
+        )
+        for i in range(n)
+    ]
+
+    def segmento(grupo):
+        # O último ponto do frame anterior só serve de âncora para a linha e fica invisível
+        indices = np.concatenate(([max(grupo[0] - 1, 0)], grupo))
+        return go.Scatter(
+            x=x[indices],
+            y=y[indices],
+            marker=dict(color=cores[indices], size=[0] + [tamanho] * len(grupo)),
+            text=[''] + textos[grupo].tolist()
+        )
+
+    vazio = go.Scatter(x=[], y=[])
+    # O primeiro frame também limpa os demais traces, para a animação poder recomeçar
+    frames = [go.Frame(data=[segmento(grupos[0])] + [vazio] * (n - 1), traces=list(range(n)), name="frame0")]
+    frames += [go.Frame(data=[segmento(grupos[i])], traces=[i], name=f"frame{i}") for i in range(1, n)]
+    return traces, frames
+
+
+def _menu_animacao():
+    """Retorna os botões de play/pause no mesmo formato gerado pelo plotly express."""
+    return [dict(
+        type="buttons",
+        direction="left",
+        showactive=False,
+        x=0.1,
+        y=0,
+        xanchor="right",
+        yanchor="top",
+        pad=dict(r=10, t=70),
+        buttons=[
+            dict(label="&#9654;",
+                 method="animate",
+                 args=[None, {"frame": {"duration": 500, "redraw": True},
+                              "mode": "immediate",
+                              "fromcurrent": True,
+                              "transition": {"duration": 500, "easing": "linear"}}]),
+            dict(label="&#9724;",
+                 method="animate",
+                 args=[[None], {"frame": {"duration": 0, "redraw": False},
+                                "mode": "immediate",
+                                "fromcurrent": True,
+                                "transition": {"duration": 0, "easing": "linear"}}])
+        ]
+    )]
+
+def _cores_por_titulo(titulos):
+    """Atribui a cada título uma cor da paleta padrão do plotly, como faz o px com color='Título'."""
+    paleta = np.array(px.colors.qualitative.Plotly)
+    return paleta[pd.factorize(titulos)[0] % len(paleta)]
+
+
+def _slider_animacao(nomes_frames):
+    """Retorna o slider de frames no mesmo formato gerado pelo plotly express."""
+    return dict(
+        active=0,
+        currentvalue={"prefix": "frames="},
+        len=0.9,
+        pad={"b": 10, "t": 60},
+        x=0.1,
+        xanchor="left",
+        y=0,
+        yanchor="top",
+        steps=[
+            dict(label=nome,
+                 method="animate",
+                 args=[[nome], {"frame": {"duration": 0, "redraw": False},
+                                "mode": "immediate",
+                                "fromcurrent": True,
+                                "transition": {"duration": 0, "easing": "linear"}}])
+            for nome in nomes_frames
+        ]
+    )
+
+
+def construir_frames_combinados(datas, notas, titulos, numeros_frames):
+    """
+    Constrói a timeline combinada (linha + dispersão) diretamente de arrays,
+    sem o plotly express. A linha com todas as leituras é fixa (trace 0) e cada
+    frame envia apenas os pontos do seu número de frame no trace de dispersão
+    (trace 1), em vez de um trace por título.
+
+    Os frames são dicionários simples com listas já tipadas: validar um
+    go.Frame/go.Scatter por livro era o custo dominante da geração.
+
+    Args:
+        datas (numpy.ndarray): Datas de conclusão, em ordem crescente
+        notas (numpy.ndarray): Nota de cada livro
+        titulos (numpy.ndarray): Título de cada livro
+        numeros_frames (numpy.ndarray): Número do frame de cada livro, não decrescente
+
+    Returns:
+        tuple[list[go.Scatter], list[dict]]: Traces iniciais e frames
+    """
+    cores = _cores_por_titulo(titulos)
+    datas_iso = np.datetime_as_string(datas.astype('datetime64[s]'))
+
+    linha = go.Scatter(
+        x=datas,
+        y=notas,
+        mode='lines',
+        line=dict(shape='spline'),
+        opacity=0.8,
+        hoverinfo='skip',
+        showlegend=False
+    )
+
+    def pontos(indices):
+        return dict(
+            type='scatter',
+            x=datas_iso[indices].tolist(),
+            y=notas[indices].tolist(),
+            mode='markers',
+            marker=dict(color=cores[indices].tolist()),
+            hovertext=titulos[indices].tolist(),
+            hoverinfo='x+y+text',
+            name=str(titulos[indices[-1]]),
+            showlegend=True
+        )
+
+    grupos = _grupos_frames(numeros_frames)
+
+    frames = [
+        dict(data=[pontos(grupo)], traces=[1], name=str(numeros_frames[grupo[0]]))
+        for grupo in grupos
+    ]
+    return [linha, go.Scatter(pontos(grupos[0]))], frames
+
+
+def criar_timeline_animada_combinada(df, incremental=False, orcamento_frames=ORCAMENTO_FRAMES):
     """
     Cria uma timeline animada de livros usando Plotly (scatter + line plot) e exibe no Streamlit.
 
     Args:
         df (pd.DataFrame): DataFrame contendo os dados dos livros, com as colunas:
             'Título', 'Conclusão' (datetime), 'Nota', e outras colunas para personalização.
+        incremental (bool): Se True, usa a animação incremental, em que cada frame
+            envia apenas o livro revelado (payload O(n) em vez de O(n²))
+        orcamento_frames (int): Número máximo de frames; acima dele os livros
+            são agrupados por dia, semana ou mês
     """
 
-    # Converter 'Conclusão' para datetime se ainda não for
+    # Converter 'Conclusão' para datetime se ainda não for, mantendo só a data
     df = criar_estrelas(df,'Nota')
-    df['Conclusão'] = pd.to_datetime(df['Conclusão'])
-    df['Conclusão'] = pd.to_datetime(df['Conclusão']
-                            .astype(str)
-                            .str[:10],
-                            format="%Y-%m-%d") # Control ChatGPT date format output
+    df['Conclusão'] = pd.to_datetime(df['Conclusão']).dt.normalize()
     df = df.sort_values('Conclusão', ignore_index=True)
 
-    # Ordenar o DataFrame pela data de conclusão
-    df_indexed = assign_frames(df,'Conclusão')
-    # df_indexed = pd.DataFrame()
-    # for index in np.arange(start=0,
-    #                    stop=len(df)+1,
-    #                    step=1):
-    #     df_slicing = df.iloc[:index].copy()
-    #     df_slicing['frames'] = (index//1)
-    #     df_indexed = pd.concat([df_indexed, df_slicing])
-
-
-
-    print(df_indexed)
-
-    # Scatter Plot
-    scatter_plot = px.scatter(
-        df_indexed,
-        x='Conclusão',
-        y='Nota',
-        color='Título',
-        animation_frame='frames'
-        #text=df['estrelas']
-        #color_discrete_sequence=RETAIL_GROUP_COLORS
-    )
-    scatter_plot.update_traces(mode="markers+lines", hovertemplate=None)
-    scatter_plot.update_layout(hovermode="x")
-
-
-    for frame in scatter_plot.frames:
-        for data in frame.data:
-            data.update(mode='markers',
-                        showlegend=True,
-                        opacity=1)
-            data['x'] = np.take(data['x'], [-1])
-            data['y'] = np.take(data['y'], [-1])
-
-    # Line Plot
-    line_plot = px.line(
-        df_indexed,
-        x='Conclusão',
-        y='Nota',
-        color='Título',
-        animation_frame='frames',
-        #color_discrete_sequence=RETAIL_GROUP_COLORS,
-        width=1000,
-        height=500,
-        line_shape='spline'  # make a line graph curvy
-    )
-    line_plot.update_traces(showlegend=False)  # legend will be from line graph
-    for frame in line_plot.frames:
-        for data in frame.data:
-            data.update(mode='lines', opacity=0.8, showlegend=False)
+    datas = df['Conclusão'].to_numpy()
+    notas = df['Nota'].to_numpy(dtype=float)
+    titulos = df['Título'].astype(str).to_numpy()
+    numeros_frames, granularidade = numerar_frames(datas, orcamento_frames)
+    _legenda_agrupamento(granularidade, numeros_frames)
+
+    if incremental:
+        traces, frames = construir_frames_incrementais(
+            datas,
+            notas,
+            titulos,
+            _cores_por_titulo(titulos),
+            marcador=dict(size=25),
+            linha=dict(shape='spline', width=5),
+            numeros_frames=numeros_frames
+        )
+        layout = dict(width=1000, height=500, updatemenus=_menu_animacao())
+    else:
+        # Um frame por livro (ou por período), na ordem de conclusão
+        traces, frames = construir_frames_combinados(datas, notas, titulos, numeros_frames)
+        layout = dict(
+            width=1000,
+            height=500,
+            updatemenus=_menu_animacao(),
+            sliders=[_slider_animacao([frame['name'] for frame in frames])]
+        )
 
     # Stationary combined plot
-    combined_plot = go.Figure(
-        data=line_plot.data + scatter_plot.data,
-        frames=[
-            go.Frame(data=line_plot.data + scatter_plot.data, name=scatter_plot.name)
-            for line_plot, scatter_plot in zip(line_plot.frames, scatter_plot.frames)
-        ],
-        layout=line_plot.layout
-    )
+    combined_plot = go.Figure(data=traces, frames=frames, layout=layout)
 
     combined_plot.update_yaxes(
         gridcolor='#03060d',
@@ -193,10 +354,10 @@ def criar_timeline_animada_combinada(df):
         yaxis_title="<b>Nota</b>",
         xaxis_title="<b>Data</b>",
         yaxis_showgrid=True,
-        xaxis_range=[df_indexed['Conclusão'].min() - pd.DateOffset(days=5),
-                    df_indexed['Conclusão'].max() + pd.DateOffset(days=5)],
-        yaxis_range=[df_indexed['Nota'].min() * 0.75,
-                    df_indexed['Nota'].max() * 1.25],
+        xaxis_range=[df['Conclusão'].min() - pd.DateOffset(days=5),
+                    df['Conclusão'].max() + pd.DateOffset(days=5)],
+        yaxis_range=[df['Nota'].min() * 0.75,
+                    df['Nota'].max() * 1.25],
         plot_bgcolor='#9c1e2a',
         paper_bgcolor='#1f08a1',
         title_x=0.5
@@ -212,7 +373,77 @@ def criar_timeline_animada_combinada(df):
     # Ajustar as configurações do gráfico para melhor apresentação no Streamlit
     st.plotly_chart(combined_plot)
 
-def criar_linha_tempo_leitura(df):
+def _rotulos_linha_tempo(df_filtrado):
+    """Retorna o rótulo "<Título> Nota: <nota>" de cada livro como array."""
+    return (df_filtrado['Título'].astype(str) + " Nota: " + df_filtrado['Nota'].map('{:.1f}'.format)).to_numpy()
+
+def _estilo_pontos_linha_tempo(notas):
+    """Estilo dos pontos da linha do tempo, coloridos pela nota na escala Viridis."""
+    return dict(
+        size=15,
+        colorscale='Viridis',
+        colorbar=dict(title="Nota"),
+        showscale=True,
+        cmin=np.nanmin(notas),
+        cmax=np.nanmax(notas)
+    )
+
+def construir_frames_linha_tempo(df_filtrado, numeros_frames=None):
+    """
+    Constrói os frames da animação da linha do tempo a partir de arrays NumPy
+    pré-calculados. Cada frame tem sempre dois traces (a linha e os pontos
+    revelados até ele), em vez de um go.Scatter por livro. Como cada frame
+    repete os pontos anteriores, o payload cresce em O(n²): para históricos
+    de vários anos use construir_frames_incrementais.
+
+    Args:
+        df_filtrado (pandas.DataFrame): Livros ordenados por data de conclusão
+        numeros_frames (numpy.ndarray): Número do frame de cada livro (ver
+            numerar_frames); por padrão, um frame por livro
+
+    Returns:
+        tuple[list[go.Frame], list[go.Scatter]]: Frames da animação e os traces
+        iniciais da figura (estado do primeiro frame)
+    """
+    datas = df_filtrado['Conclusão'].to_numpy()
+    notas = df_filtrado['Nota'].to_numpy(dtype=float)
+    posicoes = np.arange(1, len(df_filtrado) + 1)
+    textos = _rotulos_linha_tempo(df_filtrado)
+    estilo_pontos = _estilo_pontos_linha_tempo(notas)
+
+    def traces_ate(fim):
+        return [
+            # Linha conectando os pontos
+            go.Scatter(
+                x=datas[:fim],
+                y=posicoes[:fim],
+                mode='lines',
+                line=dict(color='rgba(100, 100, 100, 0.5)', width=2),
+                hoverinfo='skip'
+            ),
+            # Pontos até o frame atual
+            go.Scatter(
+                x=datas[:fim],
+                y=posicoes[:fim],
+                mode='markers+text',
+                marker=dict(estilo_pontos, color=notas[:fim]),
+                text=textos[:fim],
+                textposition="top center",
+                hoverinfo='text'
+            ),
+        ]
+
+    if numeros_frames is None:
+        numeros_frames = posicoes
+    # Cada frame revela os livros até o último do seu grupo
+    fins = [grupo[-1] + 1 for grupo in _grupos_frames(numeros_frames)]
+    frames = [
+        go.Frame(data=traces_ate(fim), name=f"frame{frame_idx}")
+        for frame_idx, fim in enumerate(fins)
+    ]
+    return frames, traces_ate(fins[0])
+
+def criar_linha_tempo_leitura(df, incremental=False, orcamento_frames=ORCAMENTO_FRAMES):
     """
     Cria uma linha do tempo interativa de leitura com animação, usando Streamlit e Plotly,
     começando no livro mais antigo e progredindo até o mais recente.
@@ -223,6 +454,10 @@ def criar_linha_tempo_leitura(df):
         - 'Título': Título do livro
         - 'Conclusão': Data de conclusão da leitura
         - 'Nota': Nota dada ao livro
+    incremental (bool): Valor inicial da opção de animação leve, em que cada
+        frame envia apenas o livro revelado. Com "Mostrar Todos os Anos" a
+        animação leve é sempre usada, para o payload crescer linearmente
+    orcamento_frames (int): Número máximo de frames da animação
     """
     # Verificar colunas necessárias
     colunas_necessarias = ['Título', 'Conclusão', 'Nota']
@@ -256,6 +491,13 @@ def criar_linha_tempo_leitura(df):
     with col2:
         # Opção de mostrar todos os anos
         mostrar_todos = st.checkbox("Mostrar Todos os Anos", value=False)
+        # Com todos os anos, a animação completa repetiria o histórico inteiro em cada frame
+        incremental = st.checkbox(
+            "Animação leve",
+            value=incremental or mostrar_todos,
+            disabled=mostrar_todos,
+            help="Envia cada livro uma única vez ao navegador. Sempre usada ao mostrar todos os anos."
+        ) or mostrar_todos
 
     # Filtrar dados
     if not mostrar_todos:
@@ -265,72 +507,27 @@ def criar_linha_tempo_leitura(df):
         
     fig = go.Figure()
 
-    # Criar frames para animação
-    frames = []
-    
-    for frame_idx in range(len(df_filtrado)):
-        frame_data = []
-
-        # Dados até o frame atual
-        current_data = df_filtrado.iloc[:frame_idx + 1]
-
-        # Adicionar linha conectando os pontos
-        if len(current_data) > 1:
-            frame_data.append(
-                go.Scatter(
-                    x=current_data['Conclusão'],
-                    y=list(range(1, len(current_data) + 1)),
-                    mode='lines',
-                    line=dict(color='rgba(100, 100, 100, 0.5)', width=2),
-                    hoverinfo='skip'
-                )
-            )
-
-        # Adicionar pontos até o frame atual
-        for idx, (_, linha) in enumerate(current_data.iterrows(), 1):
-            frame_data.append(
-                go.Scatter(
-                    x=[linha['Conclusão']],
-                    y=[idx],
-                    mode='markers+text',
-                    marker=dict(
-                        size=15,
-                        color=linha['Nota'],
-                        colorscale='Viridis',
-                        colorbar=dict(title="Nota"),
-                        showscale=True,
-                        cmin=df_filtrado['Nota'].min(),
-                        cmax=df_filtrado['Nota'].max()
-                    ),
-                    text=[f"{linha['Título']} Nota: {linha['Nota']:.1f}"],
-                    textposition="top center",
-                    hoverinfo='text'
-                )
-            )
+    # Agrupa os livros por período quando passam do orçamento de frames
+    numeros_frames, granularidade = numerar_frames(df_filtrado['Conclusão'].to_numpy(), orcamento_frames)
+    _legenda_agrupamento(granularidade, numeros_frames)
 
-        frames.append(go.Frame(data=frame_data, name=f"frame{frame_idx}"))
-
-    # Configuração inicial do gráfico com o primeiro ponto
-    first_row = df_filtrado.iloc[0]
-    fig.add_trace(
-         go.Scatter(
-            x=[first_row['Conclusão']],
-            y=[1],
-            mode='markers+text',
-            marker=dict(
-                size=15,
-                color=first_row['Nota'],
-                colorscale='Viridis',
-                colorbar=dict(title="Nota"),
-                showscale=True,
-                cmin=df_filtrado['Nota'].min(),
-                cmax=df_filtrado['Nota'].max()
-            ),
-            text=[f"{first_row['Título']} Nota: {first_row['Nota']:.1f}"],
-            textposition="top center",
-            hoverinfo='text'
+    # Criar frames para animação
+    if incremental:
+        # Um trace por frame; cada frame envia apenas os livros revelados nele
+        notas = df_filtrado['Nota'].to_numpy(dtype=float)
+        traces_iniciais, frames = construir_frames_incrementais(
+            df_filtrado['Conclusão'].to_numpy(),
+            np.arange(1, len(df_filtrado) + 1),
+            _rotulos_linha_tempo(df_filtrado),
+            notas,
+            marcador=_estilo_pontos_linha_tempo(notas),
+            linha=dict(color='rgba(100, 100, 100, 0.5)', width=2),
+            numeros_frames=numeros_frames
         )
-    )
+    else:
+        # Dois traces por frame: linha e pontos
+        frames, traces_iniciais = construir_frames_linha_tempo(df_filtrado, numeros_frames)
+    fig.add_traces(traces_iniciais)
 
     # Adicionar frames à figura
     fig.frames = frames
@@ -433,53 +630,410 @@ def criar_linha_tempo_leitura(df):
         </div>
         """, unsafe_allow_html=True)
 
-def preparar_dados_para_analise(df):
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+def _contagem(df, coluna):
+    """Retorna value_counts da coluna, ou None se ela não existir no DataFrame."""
+    return df[coluna].value_counts() if coluna in df.columns else None
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def calcular_agregados_livros(chave, ano_inicio, ano_fim, _df):
     """
-    Prepara o DataFrame para análise, garantindo tipos de dados corretos.
-    
+    Filtra os livros do período e calcula todos os agregados usados pelo
+    dashboard. O cache é indexado pelo hash da planilha e pelo intervalo de
+    anos (`_df` não entra no hash) e descarta os períodos menos usados quando
+    passa de 32 entradas.
+
     Args:
-        df (pandas.DataFrame): DataFrame original
-    
+        chave (str): Hash da planilha
+        ano_inicio (int): Ano inicial do período
+        ano_fim (int): Ano final do período
+        _df (pandas.DataFrame): DataFrame preparado
+
     Returns:
-        pandas.DataFrame: DataFrame preparado
+        dict: Agregados do período, ou None se não houver livros nele
     """
-    # Converte colunas para os tipos corretos
-    df['Conclusão'] = pd.to_datetime(df['Conclusão'], errors='coerce')
-    df['Ano de Publicação'] = pd.to_numeric(df['Ano de Publicação'], errors='coerce')
-    df['Páginas'] = pd.to_numeric(df['Páginas'], errors='coerce')
-    df['Nota'] = pd.to_numeric(df['Nota'], errors='coerce')
-    
-    # Remove linhas com datas inválidas
-    df_limpo = df.dropna(subset=['Conclusão'])
-    
-    return df_limpo
+    df = filtrar_livros_por_anos(_df, list(range(ano_inicio, ano_fim + 1)))
+    if df.empty:
+        return None
 
-def filtrar_livros_por_anos(df, anos_selecionados):
+    def destaque(indice):
+        return df.loc[indice, ['Título', 'Páginas', 'Ano de Publicação']].to_dict()
+
+    regiao_counts = df['Região'].value_counts()
+    pais_counts = df['País'].value_counts()
+    lgbt_counts = _contagem(df, 'Autor/Temática LGBTQIA+?')
+
+    return {
+        'total_livros': len(df),
+        'total_paginas': df['Páginas'].sum(),
+        'media_paginas': df['Páginas'].mean(),
+        'media_nota': df['Nota'].mean(),
+        'total_paises': df['País'].nunique(),
+        'total_autores': df['Autor'].nunique(),
+        'total_regioes': df['Região'].nunique(),
+        'maior_livro': destaque(df['Páginas'].idxmax()),
+        'menor_livro': destaque(df['Páginas'].idxmin()),
+        'mais_antigo': destaque(df['Ano de Publicação'].idxmin()),
+        'mais_novo': destaque(df['Ano de Publicação'].idxmax()),
+        'ficcao_count': df['Ficção'].value_counts().get('Sim', 0),
+        'lgbt_count': lgbt_counts.get('Sim', 0) if lgbt_counts is not None else 0,
+        'notas': df['Nota'].to_numpy(),
+        'genero_counts': df['Gênero'].value_counts(),
+        'notas_por_genero': df.groupby('Gênero', observed=True)['Nota'].mean().sort_values(ascending=False),
+        'sexo_autor_counts': df['Sexo Autor'].value_counts(),
+        'etnia_counts': _contagem(df, 'Etnia'),
+        'livros_por_mes': df.groupby('Mês Conclusão').size(),
+        'paginas_por_mes': df.groupby('Mês Conclusão')['Páginas'].sum(),
+        'pais_mais_lido': pais_counts.idxmax() if not pais_counts.empty else 'N/A',
+        'regiao_counts': regiao_counts,
+        'regiao_mais_lida': regiao_counts.idxmax() if not regiao_counts.empty else 'N/A',
+        'chave_periodo': (chave, ano_inicio, ano_fim),
+    }
+
+
+def _figura_generos(agregados):
+    genero_counts = agregados['genero_counts']
+    fig = px.pie(
+        values=genero_counts.values,
+        names=genero_counts.index,
+        title=f'📚 Distribuição de Livros por Gênero 📚',
+        color_discrete_sequence=cores_graficos,
+    )
+    fig.update_traces(textinfo='percent+label', textfont_size=12)
+    return fig
+
+
+def _figura_notas(agregados):
+    return px.histogram(
+        x=agregados['notas'],
+        title=f'📊 Distribuição das Notas Atribuídas 💯',
+        labels={'x': 'Nota do Livro'},
+        color_discrete_sequence=cores_graficos,
+    )
+
+
+def _figura_notas_por_genero(agregados):
+    notas_por_genero = agregados['notas_por_genero']
+    return px.bar(
+        x=notas_por_genero.index,
+        y=notas_por_genero.values,
+        title=f'⭐ Média de Notas por Gênero 🌟',
+        labels={'x': 'Gênero', 'y': 'Média da Nota'},
+        color_discrete_sequence=cores_graficos,
+    )
+
+
+def _figura_sexo_autor(agregados):
+    sexo_autor_counts = agregados['sexo_autor_counts']
+    fig = px.pie(
+        values=sexo_autor_counts.values,
+        names=sexo_autor_counts.index,
+        title=f'🚻 Distribuição de Livros por Sexo do Autor 🚻',
+        color_discrete_sequence=cores_graficos,
+    )
+    fig.update_traces(textinfo='percent+label', textfont_size=12)
+    return fig
+
+
+def _figura_etnia(agregados):
+    etnia_counts = agregados['etnia_counts']
+    return px.bar(
+        x=etnia_counts.index,
+        y=etnia_counts.values,
+        title=f'🌍 Número de Livros por Etnia do Autor 🌍',
+        labels={'x': 'Etnia', 'y': 'Número de Livros'},
+        color_discrete_sequence=cores_graficos,
+    )
+
+
+def _figura_livros_mes(agregados):
+    livros_por_mes = agregados['livros_por_mes']
+    return px.line(
+        x=livros_por_mes.index.astype(str),
+        y=livros_por_mes.values,
+        title=f'📅 Número de Livros Lidos por Mês 📚',
+        labels={'x': 'Mês', 'y': 'Número de Livros'},
+        color_discrete_sequence=cores_graficos,
+    )
+
+
+def _figura_paginas_mes(agregados):
+    paginas_por_mes = agregados['paginas_por_mes']
+    return px.bar(
+        x=paginas_por_mes.index.astype(str),
+        y=paginas_por_mes.values,
+        title=f'📖 Total de Páginas Lidas por Mês 🗓️',
+        labels={'x': 'Mês', 'y': 'Número de Páginas'},
+        color_discrete_sequence=cores_graficos,
+    )
+
+
+def _figura_regioes(agregados):
+    regiao_counts = agregados['regiao_counts']
+    fig = px.pie(
+        values=regiao_counts.values,
+        names=regiao_counts.index,
+        title=f'🗺️ Distribuição de Livros por Região 🌍',
+        color_discrete_sequence=cores_graficos,
+    )
+    fig.update_traces(textinfo='percent+label', textfont_size=12)
+    return fig
+
+
+# Cada figura do dashboard é declarada uma única vez aqui e referenciada pelo nome nas abas
+CONSTRUTORES_FIGURAS = {
+    'generos_pie': _figura_generos,
+    'notas_hist': _figura_notas,
+    'notas_genero_bar': _figura_notas_por_genero,
+    'sexo_autor_pie': _figura_sexo_autor,
+    'etnia_bar': _figura_etnia,
+    'livros_mes_line': _figura_livros_mes,
+    'paginas_mes_bar': _figura_paginas_mes,
+    'regioes_pie': _figura_regioes,
+}
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def construir_figura(chave_periodo, nome, _agregados):
     """
-    Filtra livros para os anos selecionados.
-    
+    Constrói uma figura do dashboard uma única vez por planilha e período.
+
+    A figura é guardada como dicionário: assim toda execução, inclusive a
+    primeira, envia ao navegador exatamente a mesma especificação, e o
+    Streamlit troca o gráfico já recebido por uma referência ao seu hash
+    (veja global.minCachedMessageSize em .streamlit/config.toml).
+
     Args:
-        df (pandas.DataFrame): DataFrame preparado
-        anos_selecionados (List[int]): Anos selecionados para análise
-    
+        chave_periodo (tuple): Hash da planilha e intervalo de anos dos agregados
+        nome (str): Nome da figura em CONSTRUTORES_FIGURAS
+        _agregados (dict): Agregados do período (não entram no hash)
+
     Returns:
-        pandas.DataFrame: DataFrame filtrado
+        dict: Especificação da figura pronta para exibição
     """
-    return df[df['Conclusão'].dt.year.isin(anos_selecionados)]
+    return CONSTRUTORES_FIGURAS[nome](_agregados).to_dict()
+
+
+def _plotar(agregados, nome, key):
+    """Exibe uma figura do dashboard; só é reenviada se a especificação mudar."""
+    fig = construir_figura(agregados['chave_periodo'], nome, agregados)
+    st.plotly_chart(fig, use_container_width=True, key=key)
+
+
+def _aba_estatisticas_gerais(agregados):
+    st.header("Estatísticas Gerais dos Livros")
+
+    st.subheader("Resumo dos Livros")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("📚 Livros Lidos", agregados['total_livros'])
+    with col2:
+        st.metric("📖 Páginas Totais", agregados['total_paginas'])
+    with col3:
+        st.metric("📏 Média de Páginas", f"{agregados['media_paginas']:.0f}")
+
+    col4, col5, col6 = st.columns(3)
+    with col4:
+        st.metric("💯 Nota média", f"{agregados['media_nota']:.1f}")
+    with col5:
+        st.metric("🌎 Países", agregados['total_paises'])
+    with col6:
+        st.metric("✍️ Autores", agregados['total_autores'])
+    st.subheader("Livros em Destaque")
+    col_maior, col_menor = st.columns(2)
+    with col_maior:
+        maior_livro = agregados['maior_livro']
+        st.markdown(f"**Livro Mais Longo:**")
+        st.markdown(
+            f"""
+            <div style="display: flex; align-items: center; margin-bottom: 8px;">
+                <span style="font-size: 1.2em;">📚</span>
+                <span style="margin-left: 5px;"><strong>{maior_livro['Título']}</strong></span>
+            </div>
+            <div><span style="font-size: 1em;">📖</span> <span style="margin-left: 5px;"><em>Páginas: {maior_livro['Páginas']}</em></span></div>
+            """, unsafe_allow_html=True
+        )
+
+    with col_menor:
+        menor_livro = agregados['menor_livro']
+        st.markdown(f"**Livro Mais Curto:**")
+        st.markdown(
+                f"""
+                <div style="display: flex; align-items: center; margin-bottom: 8px;">
+                <span style="font-size: 1.2em;">📖</span>
+                <span style="margin-left: 5px;"><strong>{menor_livro['Título']}</strong></span>
+                </div>
+            <div><span style="font-size: 1em;">📄</span> <span style="margin-left: 5px;"><em>Páginas: {menor_livro['Páginas']}</em></span></div>
+            """, unsafe_allow_html=True
+        )
+
+    # --- Mais Antigo vs Mais Novo ---
+    col_antigo, col_novo= st.columns(2)
+    with col_antigo:
+        mais_antigo = agregados['mais_antigo']
+        st.markdown(f"**Livro Mais Antigo:**")
+        st.markdown(
+                f"""
+                <div style="display: flex; align-items: center; margin-bottom: 8px;">
+                <span style="font-size: 1.2em;">🕰️</span>
+                <span style="margin-left: 5px;"><strong>{mais_antigo['Título']}</strong></span>
+                </div>
+            <div><span style="font-size: 1em;">🗓️</span> <span style="margin-left: 5px;"><em>Ano: {mais_antigo['Ano de Publicação']}</em></span></div>
+            """, unsafe_allow_html=True
+        )
+    with col_novo:
+        mais_novo = agregados['mais_novo']
+        st.markdown(f"**Livro Mais Recente:**")
+        st.markdown(
+                f"""
+                <div style="display: flex; align-items: center; margin-bottom: 8px;">
+                <span style="font-size: 1.2em;">🆕</span>
+                    <span style="margin-left: 5px;"><strong>{mais_novo['Título']}</strong></span>
+                </div>
+                <div><span style="font-size: 1em;">🗓️</span> <span style="margin-left: 5px;"><em>Ano: {mais_novo['Ano de Publicação']}</em></span></div>
+            """, unsafe_allow_html=True
+        )
+    st.subheader("Diversidade de Leituras")
+    col_metric1, col_metric2= st.columns(2)
+    # --- Métricas Ficção vs Não Ficção ---
+    with col_metric1:
+        total_books = agregados['total_livros']
+
+        # Calculate counts and percentages for Fiction
+        ficcao_count = agregados['ficcao_count']
+        ficcao_percentage = (ficcao_count / total_books * 100) if total_books > 0 else 0
+
+        # Calculate counts and percentages for Non-Fiction
+        nao_ficcao_count = agregados['lgbt_count']
+        nao_ficcao_percentage = (nao_ficcao_count / total_books * 100) if total_books > 0 else 0
+
+        # Display metrics with percentages as deltas
+        st.metric(
+            label="📚 Ficção",
+            value=ficcao_count,
+            delta=f"{ficcao_percentage:.1f}% do total"
+        )
+
+        st.metric(
+            label="🌈 LGBT",
+            value=nao_ficcao_count,
+            delta=f"{nao_ficcao_percentage:.1f}% do total"
+        )
+
+    # --- Métricas Negro vs Branco ---
+    with col_metric2:
+        if agregados['etnia_counts'] is not None:
+            # Calculate counts and percentages for Black authors
+            negro_count = agregados['etnia_counts'].get('Negra', 0)
+            total_books = agregados['total_livros']
+            negro_percentage = (negro_count / total_books * 100) if total_books > 0 else 0
+
+            # Calculate counts and percentages for Women authors
+            mulheres_count = agregados['sexo_autor_counts'].get('F', 0)  # Assuming 'F' for Female
+            mulheres_percentage = (mulheres_count / total_books * 100) if total_books > 0 else 0
+
+            # Display metrics with percentages as deltas
+            st.metric(
+                label="🔳 Autores Negros",
+                value=negro_count,
+                delta=f"{negro_percentage:.1f}% do total"
+            )
+
+            st.metric(
+                label="👩 Autores Mulheres",
+                value=mulheres_count,
+                delta=f"{mulheres_percentage:.1f}% do total"
+            )
+
+    # --- Distribuição em Gêneros ---
+    st.subheader("Distribuição de Gêneros")
+    _plotar(agregados, 'generos_pie', key="tab1_generos_pie")
+
+    # --- Distribuição das Notas ---
+    st.subheader("Distribuição das Notas")
+    _plotar(agregados, 'notas_hist', key="tab1_notas_hist")
+
+
+def _aba_generos(agregados):
+    st.header("Análise de Gêneros Literários")
+
+    # Gráfico de contagem de livros por gênero
+    col_etnia, col_genero = st.columns(2)
+    with col_genero:
+        _plotar(agregados, 'generos_pie', key="tab2_generos_pie")
+
+    # Gráfico de médias de notas por gênero
+    with col_etnia:
+        _plotar(agregados, 'notas_genero_bar', key="tab2_notas_genero_bar")
+
+
+def _aba_autores(agregados):
+    st.header("Perfil dos Autores")
+
+    # Distribuição de autores por sexo
+    _plotar(agregados, 'sexo_autor_pie', key="tab3_sexo_autor_pie")
+
+    # Gráfico de etnia dos autores
+    _plotar(agregados, 'etnia_bar', key="tab3_etnia_bar")
+
+
+def _aba_tendencias(agregados):
+    st.header("Tendências de Leitura")
+
+    # Gráfico de livros lidos por mês
+    _plotar(agregados, 'livros_mes_line', key="tab4_livros_mes_line")
+
+    # Gráfico de páginas lidas por mês
+    _plotar(agregados, 'paginas_mes_bar', key="tab4_paginas_mes_bar")
 
-import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 
+def _aba_geografico(agregados):
+    st.header("Análise Geográfica")
 
+    # Estatísticas Geográficas
+    st.subheader("Estatísticas Geográficas")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Número de Países", agregados['total_paises'])
+    with col2:
+        st.metric("País Mais Lido", agregados['pais_mais_lido'])
+    with col3:
+        st.metric("Número de Continentes", agregados['total_regioes'])
+
+    # Continente Mais Lido
+    st.subheader("Continente Mais Lido")
+    st.markdown(f"**O continente mais lido é:** {agregados['regiao_mais_lida']}")
+
+    # Distribuição por Regiões
+    st.subheader("Distribuição de Livros por Região")
+    _plotar(agregados, 'regioes_pie', key="tab5_regioes_pie")
 
-def criar_visualizacoes_livros(df):
+
+# Registro das abas do dashboard: cada aba é declarada e renderizada uma única vez
+ABAS_ANALISE = [
+    ("Estatísticas Gerais", _aba_estatisticas_gerais),
+    ("Análise de Gêneros", _aba_generos),
+    ("Perfil dos Autores", _aba_autores),
+    ("Tendências de Leitura", _aba_tendencias),
+    ("Geográfico", _aba_geografico),
+]
+
+
+def criar_visualizacoes_livros(agregados, sob_demanda=False):
     """
     Cria múltiplas visualizações de dados de livros usando Plotly e Streamlit.
 
     Args:
-        df (pandas.DataFrame): DataFrame com informações dos livros
+        agregados (dict): Agregados do período retornados por calcular_agregados_livros
+        sob_demanda (bool): Se True, apenas a aba selecionada é construída e
+            enviada ao navegador; as demais só são calculadas quando abertas
     """
      # Estilo CSS para as tabs
     st.markdown(
@@ -525,400 +1079,21 @@ def criar_visualizacoes_livros(df):
     # Título da página
     st.title("📊 Análise Detalhada de Leitura")
 
-    # Divide a página em colunas
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-        "Estatísticas Gerais",
-        "Análise de Gêneros",
-        "Perfil dos Autores",
-        "Tendências de Leitura",
-        "Geográfico",
-    ])
-
-    with tab1:
-        st.header("Estatísticas Gerais dos Livros")
-
-        st.subheader("Resumo dos Livros")
-
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("📚 Livros Lidos", df.shape[0])
-        with col2:
-            st.metric("📖 Páginas Totais", df['Páginas'].sum())
-        with col3:
-            st.metric("📏 Média de Páginas", f"{df['Páginas'].mean():.0f}")
-
-        col4, col5, col6 = st.columns(3)
-        with col4:
-            st.metric("💯 Nota média", f"{df['Nota'].mean():.1f}")
-        with col5:
-            st.metric("🌎 Países", df['País'].nunique())
-        with col6:
-            st.metric("✍️ Autores", df['Autor'].nunique())
-        st.subheader("Livros em Destaque")
-        col_maior, col_menor = st.columns(2)
-        with col_maior:
-            maior_livro = df.loc[df['Páginas'].idxmax()]
-            st.markdown(f"**Livro Mais Longo:**")
-            st.markdown(
-                f"""
-                <div style="display: flex; align-items: center; margin-bottom: 8px;">
-                    <span style="font-size: 1.2em;">📚</span>
-                    <span style="margin-left: 5px;"><strong>{maior_livro['Título']}</strong></span>
-                </div>
-                <div><span style="font-size: 1em;">📖</span> <span style="margin-left: 5px;"><em>Páginas: {maior_livro['Páginas']}</em></span></div>
-                """, unsafe_allow_html=True
-            )
-            
-        with col_menor:
-            menor_livro = df.loc[df['Páginas'].idxmin()]
-            st.markdown(f"**Livro Mais Curto:**")
-            st.markdown(
-                    f"""
-                    <div style="display: flex; align-items: center; margin-bottom: 8px;">
-                    <span style="font-size: 1.2em;">📖</span>
-                    <span style="margin-left: 5px;"><strong>{menor_livro['Título']}</strong></span>
-                    </div>
-                <div><span style="font-size: 1em;">📄</span> <span style="margin-left: 5px;"><em>Páginas: {menor_livro['Páginas']}</em></span></div>
-                """, unsafe_allow_html=True
-            )
-        
-        # --- Mais Antigo vs Mais Novo ---
-        col_antigo, col_novo= st.columns(2)
-        with col_antigo:
-            mais_antigo = df.loc[df['Ano de Publicação'].idxmin()]
-            st.markdown(f"**Livro Mais Antigo:**")
-            st.markdown(
-                    f"""
-                    <div style="display: flex; align-items: center; margin-bottom: 8px;">
-                    <span style="font-size: 1.2em;">🕰️</span>
-                    <span style="margin-left: 5px;"><strong>{mais_antigo['Título']}</strong></span>
-                    </div>
-                <div><span style="font-size: 1em;">🗓️</span> <span style="margin-left: 5px;"><em>Ano: {mais_antigo['Ano de Publicação']}</em></span></div>
-                """, unsafe_allow_html=True
-            )
-        with col_novo:
-            mais_novo = df.loc[df['Ano de Publicação'].idxmax()]
-            st.markdown(f"**Livro Mais Recente:**")
-            st.markdown(
-                    f"""
-                    <div style="display: flex; align-items: center; margin-bottom: 8px;">
-                    <span style="font-size: 1.2em;">🆕</span>
-                        <span style="margin-left: 5px;"><strong>{mais_novo['Título']}</strong></span>
-                    </div>
-                    <div><span style="font-size: 1em;">🗓️</span> <span style="margin-left: 5px;"><em>Ano: {mais_novo['Ano de Publicação']}</em></span></div>
-                """, unsafe_allow_html=True
-            )
-        st.subheader("Diversidade de Leituras")
-        col_metric1, col_metric2= st.columns(2)
-# --- Métricas Ficção vs Não Ficção ---
-        with col_metric1:
-            total_books = len(df)
-            
-            # Calculate counts and percentages for Fiction
-            ficcao_count = df['Ficção'].value_counts().get('Sim', 0)
-            ficcao_percentage = (ficcao_count / total_books * 100) if total_books > 0 else 0
-            
-            # Calculate counts and percentages for Non-Fiction
-            nao_ficcao_count = df['Autor/Temática LGBTQIA+?'].value_counts().get('Sim', 0)
-            nao_ficcao_percentage = (nao_ficcao_count / total_books * 100) if total_books > 0 else 0
-            
-            # Display metrics with percentages as deltas
-            st.metric(
-                label="📚 Ficção", 
-                value=ficcao_count,
-                delta=f"{ficcao_percentage:.1f}% do total"
-            )
-            
-            st.metric(
-                label="🌈 LGBT", 
-                value=nao_ficcao_count,
-                delta=f"{nao_ficcao_percentage:.1f}% do total"
-            )
+    nomes_abas = [nome for nome, _ in ABAS_ANALISE]
 
-        # --- Métricas Negro vs Branco ---
-        with col_metric2:
-            if 'Etnia' in df.columns:
-                # Calculate counts and percentages for Black authors
-                negro_count = df['Etnia'].value_counts().get('Negra', 0)
-                total_books = len(df)
-                negro_percentage = (negro_count / total_books * 100) if total_books > 0 else 0
-                
-                # Calculate counts and percentages for Women authors
-                mulheres_count = df['Sexo Autor'].value_counts().get('F', 0)  # Assuming 'F' for Female
-                mulheres_percentage = (mulheres_count / total_books * 100) if total_books > 0 else 0
-                
-                # Display metrics with percentages as deltas
-                st.metric(
-                    label="🔳 Autores Negros", 
-                    value=negro_count,
-                    delta=f"{negro_percentage:.1f}% do total"
-                )
-                
-                st.metric(
-                    label="👩 Autores Mulheres", 
-                    value=mulheres_count,
-                    delta=f"{mulheres_percentage:.1f}% do total"
-                )
-
-        # --- Distribuição em Gêneros ---
-        st.subheader("Distribuição de Gêneros")
-        genero_counts = df['Gênero'].value_counts()
-        fig_generos = px.pie(
-            values=genero_counts.values, 
-            names=genero_counts.index,
-             title=f'📚 Distribuição de Livros por Gênero 📚',
-            color_discrete_sequence=cores_graficos,
-        )
-        fig_generos.update_traces(textinfo='percent+label', textfont_size=12)
-        st.plotly_chart(fig_generos, use_container_width=True, key="tab1_generos_pie")
-
-         # --- Distribuição das Notas ---
-        st.subheader("Distribuição das Notas")
-        fig_notas = px.histogram(
-            df,
-            x='Nota',
-            title=f'📊 Distribuição das Notas Atribuídas 💯',
-            labels={'Nota': 'Nota do Livro'},
-            color_discrete_sequence=cores_graficos,
-        )
-        st.plotly_chart(fig_notas, use_container_width=True, key="tab1_notas_hist")
-        
-        # --- Maior vs Menor Livro ---
-        
-    with tab2:
-        st.header("Análise de Gêneros Literários")
-
-        # Gráfico de contagem de livros por gênero
-        col_etnia, col_genero = st.columns(2)
-        with col_genero:
-            genero_counts = df['Gênero'].value_counts()
-            fig_generos = px.pie(
-                values=genero_counts.values,
-                names=genero_counts.index,
-                title=f'📚 Distribuição de Livros por Gênero 📚',
-                color_discrete_sequence=cores_graficos,
-            )
-            fig_generos.update_traces(textinfo='percent+label', textfont_size=12)
-            st.plotly_chart(fig_generos, use_container_width=True, key="tab2_generos_pie")
-
-        # Gráfico de médias de notas por gênero
-        with col_etnia:
-            notas_por_genero = df.groupby('Gênero')['Nota'].mean().sort_values(ascending=False)
-            fig_notas_genero = px.bar(
-                x=notas_por_genero.index,
-                y=notas_por_genero.values,
-                title=f'⭐ Média de Notas por Gênero 🌟',
-                labels={'x': 'Gênero', 'y': 'Média da Nota'},
-                color_discrete_sequence=cores_graficos,
-            )
-            st.plotly_chart(fig_notas_genero, use_container_width=True, key="tab2_notas_genero_bar")
-
-    with tab3:
-        st.header("Perfil dos Autores")
-        
-         # Distribuição de autores por sexo
-        sexo_autor_counts = df['Sexo Autor'].value_counts()
-        fig_sexo_autor = px.pie(
-            values=sexo_autor_counts.values, 
-            names=sexo_autor_counts.index,
-            title=f'🚻 Distribuição de Livros por Sexo do Autor 🚻',
-            color_discrete_sequence=cores_graficos,
-        )
-        fig_sexo_autor.update_traces(textinfo='percent+label', textfont_size=12)
-        st.plotly_chart(fig_sexo_autor, use_container_width=True, key="tab3_sexo_autor_pie")
-        
-        # Gráfico de etnia dos autores
-        etnia_counts = df['Etnia'].value_counts()
-        fig_etnia = px.bar(
-            x=etnia_counts.index, 
-            y=etnia_counts.values,
-             title=f'🌍 Número de Livros por Etnia do Autor 🌍',
-            labels={'x': 'Etnia', 'y': 'Número de Livros'},
-            color_discrete_sequence=cores_graficos,
-        )
-        st.plotly_chart(fig_etnia, use_container_width=True, key="tab3_etnia_bar")
-
-
-    with tab4:
-        st.header("Tendências de Leitura")
-
-        # Preparar dados de conclusão
-        df['Conclusão'] = pd.to_datetime(df['Conclusão'])
-        df['Mês Conclusão'] = df['Conclusão'].dt.to_period('M')
-
-        # Gráfico de livros lidos por mês
-        livros_por_mes = df.groupby('Mês Conclusão').size()
-        fig_livros_mes = px.line(
-            x=livros_por_mes.index.astype(str),
-            y=livros_por_mes.values,
-             title=f'📅 Número de Livros Lidos por Mês 📚',
-            labels={'x': 'Mês', 'y': 'Número de Livros'},
-            color_discrete_sequence=cores_graficos,
-        )
-        st.plotly_chart(fig_livros_mes, use_container_width=True, key="tab4_livros_mes_line")
-
-        # Gráfico de páginas lidas por mês
-        paginas_por_mes = df.groupby('Mês Conclusão')['Páginas'].sum()
-        fig_paginas_mes = px.bar(
-            x=paginas_por_mes.index.astype(str),
-            y=paginas_por_mes.values,
-            title=f'📖 Total de Páginas Lidas por Mês 🗓️',
-            labels={'x': 'Mês', 'y': 'Número de Páginas'},
-             color_discrete_sequence=cores_graficos,
-        )
-        st.plotly_chart(fig_paginas_mes, use_container_width=True, key="tab4_paginas_mes_bar")
-    
-    with tab5:
-        st.header("Análise Geográfica")
-        
-        # Estatísticas Geográficas
-        st.subheader("Estatísticas Geográficas")
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Número de Países", df['País'].nunique())
-        with col2:
-           mais_lido = df['País'].value_counts().idxmax() if not df['País'].value_counts().empty else 'N/A'
-           st.metric("País Mais Lido", mais_lido)
-        with col3:
-            st.metric("Número de Continentes", df['Região'].nunique())
-        
-        # Continente Mais Lido
-        st.subheader("Continente Mais Lido")
-        continente_mais_lido = df['Região'].value_counts().idxmax() if not df['Região'].value_counts().empty else 'N/A'
-        st.markdown(f"**O continente mais lido é:** {continente_mais_lido}")
-        
-        # Distribuição por Regiões
-        st.subheader("Distribuição de Livros por Região")
-        regiao_counts = df['Região'].value_counts()
-        fig_regioes = px.pie(
-            values=regiao_counts.values,
-            names=regiao_counts.index,
-            title=f'🗺️ Distribuição de Livros por Região 🌍',
-            color_discrete_sequence=cores_graficos,
-        )
-        fig_regioes.update_traces(textinfo='percent+label', textfont_size=12)
-        st.plotly_chart(fig_regioes, use_container_width=True, key="tab5_regioes_pie")
-    
-    
-        
-
-
-
-    with tab2:
-        st.header("Análise de Gêneros Literários")
-
-        # Gráfico de contagem de livros por gênero
-        col_etnia, col_genero = st.columns(2)
-        with col_genero:
-            genero_counts = df['Gênero'].value_counts()
-            fig_generos = px.pie(
-                values=genero_counts.values,
-                names=genero_counts.index,
-                title=f'📚 Distribuição de Livros por Gênero 📚',
-                color_discrete_sequence=cores_graficos,
-            )
-            fig_generos.update_traces(textinfo='percent+label', textfont_size=12)
-            st.plotly_chart(fig_generos, use_container_width=True, key="tab2_generos_pie")
-
-        # Gráfico de médias de notas por gênero
-        with col_etnia:
-            notas_por_genero = df.groupby('Gênero')['Nota'].mean().sort_values(ascending=False)
-            fig_notas_genero = px.bar(
-                x=notas_por_genero.index,
-                y=notas_por_genero.values,
-                title=f'⭐ Média de Notas por Gênero 🌟',
-                labels={'x': 'Gênero', 'y': 'Média da Nota'},
-                color_discrete_sequence=cores_graficos,
-            )
-            st.plotly_chart(fig_notas_genero, use_container_width=True, key="tab2_notas_genero_bar")
-
-    with tab3:
-        st.header("Perfil dos Autores")
-        
-         # Distribuição de autores por sexo
-        sexo_autor_counts = df['Sexo Autor'].value_counts()
-        fig_sexo_autor = px.pie(
-            values=sexo_autor_counts.values, 
-            names=sexo_autor_counts.index,
-            title=f'🚻 Distribuição de Livros por Sexo do Autor 🚻',
-            color_discrete_sequence=cores_graficos,
-        )
-        fig_sexo_autor.update_traces(textinfo='percent+label', textfont_size=12)
-        st.plotly_chart(fig_sexo_autor, use_container_width=True, key="tab3_sexo_autor_pie")
-        
-        # Gráfico de etnia dos autores
-        etnia_counts = df['Etnia'].value_counts()
-        fig_etnia = px.bar(
-            x=etnia_counts.index, 
-            y=etnia_counts.values,
-             title=f'🌍 Número de Livros por Etnia do Autor 🌍',
-            labels={'x': 'Etnia', 'y': 'Número de Livros'},
-            color_discrete_sequence=cores_graficos,
-        )
-        st.plotly_chart(fig_etnia, use_container_width=True, key="tab3_etnia_bar")
+    if sob_demanda:
+        # st.tabs envia o conteúdo de todas as abas; aqui só a aba ativa é renderizada
+        # e suas figuras ficam em cache para o período atual
+        aba_ativa = st.radio("Aba", nomes_abas, horizontal=True, key="aba_ativa", label_visibility="collapsed")
+        dict(ABAS_ANALISE)[aba_ativa](agregados)
+        return
 
+    # Divide a página em abas, renderizando cada uma uma única vez
+    abas = st.tabs(nomes_abas)
+    for aba, (_, renderizar_aba) in zip(abas, ABAS_ANALISE):
+        with aba:
+            renderizar_aba(agregados)
 
-    with tab4:
-        st.header("Tendências de Leitura")
-
-        # Preparar dados de conclusão
-        df['Conclusão'] = pd.to_datetime(df['Conclusão'])
-        df['Mês Conclusão'] = df['Conclusão'].dt.to_period('M')
-
-        # Gráfico de livros lidos por mês
-        livros_por_mes = df.groupby('Mês Conclusão').size()
-        fig_livros_mes = px.line(
-            x=livros_por_mes.index.astype(str),
-            y=livros_por_mes.values,
-             title=f'📅 Número de Livros Lidos por Mês 📚',
-            labels={'x': 'Mês', 'y': 'Número de Livros'},
-            color_discrete_sequence=cores_graficos,
-        )
-        st.plotly_chart(fig_livros_mes, use_container_width=True, key="tab4_livros_mes_line")
-
-        # Gráfico de páginas lidas por mês
-        paginas_por_mes = df.groupby('Mês Conclusão')['Páginas'].sum()
-        fig_paginas_mes = px.bar(
-            x=paginas_por_mes.index.astype(str),
-            y=paginas_por_mes.values,
-            title=f'📖 Total de Páginas Lidas por Mês 🗓️',
-            labels={'x': 'Mês', 'y': 'Número de Páginas'},
-             color_discrete_sequence=cores_graficos,
-        )
-        st.plotly_chart(fig_paginas_mes, use_container_width=True, key="tab4_paginas_mes_bar")
-    
-    with tab5:
-        st.header("Análise Geográfica")
-        
-        # Estatísticas Geográficas
-        st.subheader("Estatísticas Geográficas")
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("Número de Países", df['País'].nunique())
-        with col2:
-           mais_lido = df['País'].value_counts().idxmax() if not df['País'].value_counts().empty else 'N/A'
-           st.metric("País Mais Lido", mais_lido)
-        with col3:
-            st.metric("Número de Continentes", df['Região'].nunique())
-        
-        # Continente Mais Lido
-        st.subheader("Continente Mais Lido")
-        continente_mais_lido = df['Região'].value_counts().idxmax() if not df['Região'].value_counts().empty else 'N/A'
-        st.markdown(f"**O continente mais lido é:** {continente_mais_lido}")
-        
-        # Distribuição por Regiões
-        st.subheader("Distribuição de Livros por Região")
-        regiao_counts = df['Região'].value_counts()
-        fig_regioes = px.pie(
-            values=regiao_counts.values,
-            names=regiao_counts.index,
-            title=f'🗺️ Distribuição de Livros por Região 🌍',
-            color_discrete_sequence=cores_graficos,
-        )
-        fig_regioes.update_traces(textinfo='percent+label', textfont_size=12)
-        st.plotly_chart(fig_regioes, use_container_width=True, key="tab5_regioes_pie")
-
-    
 
 
 
@@ -938,39 +1113,6 @@ def verificar_colunas(df, required_columns):
         raise ValueError(f"As seguintes colunas estão faltando: {missing_columns}")
 
 
-def organizar_e_filtrar_livros(df):
-
-    """
-    Organiza os livros do mais recente ao mais antigo e filtra os livros lidos no ano atual.
-    
-    Args:
-        df (pandas.DataFrame): DataFrame com informações dos livros
-    
-    Returns:
-        pandas.DataFrame: DataFrame filtrado e ordenado
-    """
-    # Verifica se a coluna 'Conclusão' existe
-    if 'Conclusão' not in df.columns:
-        raise ValueError("A coluna 'Conclusão' não existe no DataFrame.")
-    
-    # Converte a coluna 'Conclusão' para datetime
-    df['Conclusão'] = pd.to_datetime(df['Conclusão'], errors='coerce')
-    
-    # Remove linhas com datas inválidas
-    df_limpo = df.dropna(subset=['Conclusão'])
-    
-    # Ordena do mais recente ao mais antigo
-    df_ordenado = df_limpo.sort_values('Conclusão', ascending=False)
-    
-    # Obtém o ano atual
-    ano_atual = datetime.now().year
-    
-    # Filtra livros lidos no ano atual
-    df_ano_atual = df_ordenado[df_ordenado['Conclusão'].dt.year == ano_atual]
-    
-    return df_ano_atual
-
-
 def criar_metricas_livros(df):
     """
     Cria métricas e visualizações para um DataFrame de livros no Streamlit
@@ -978,11 +1120,6 @@ def criar_metricas_livros(df):
     Parameters:
     df (pandas.DataFrame): DataFrame com as informações dos livros
     """
-    # Converter colunas para tipos apropriados
-    df['Ano de Publicação'] = pd.to_numeric(df['Ano de Publicação'], errors='coerce')
-    df['Páginas'] = pd.to_numeric(df['Páginas'], errors='coerce')
-    df['Nota'] = pd.to_numeric(df['Nota'], errors='coerce')
-    
     # Layout de métricas em colunas
     col1, col2, col3, col4 = st.columns(4)
     
@@ -1094,7 +1231,6 @@ def criar_metricas_livros(df):
     
     # Média de notas por década
     st.subheader("Média de Notas por Década")
-    df['Década'] = (df['Ano de Publicação'] // 10) * 10
     notas_decada = df.groupby('Década')['Nota'].mean().round(2)
     fig_decada = px.line(x=notas_decada.index, y=notas_decada.values,
                         title="Média de Notas por Década",
@@ -1107,16 +1243,13 @@ def app_retrospectiva_leitura(df):
     Aplicativo Streamlit para retrospectiva de leitura.
     
     Args:
-        df (pandas.DataFrame): DataFrame original de livros
+        df (pandas.DataFrame): DataFrame de livros preparado pelo modelo de dados
     """
-    # Preparar dados
-    df_preparado = preparar_dados_para_analise(df)
-    
     # Título do aplicativo
     st.sidebar.title("🔍 Filtros de Retrospectiva")
     
     # Obter anos únicos de conclusão
-    anos_disponiveis = sorted(df_preparado['Conclusão'].dt.year.unique())
+    anos_disponiveis = sorted(df['Ano'].unique())
     ano_min, ano_max = min(anos_disponiveis), max(anos_disponiveis)
     
     # Seleção de intervalo de anos com slider
@@ -1148,34 +1281,63 @@ def app_retrospectiva_leitura(df):
         st.sidebar.error("O ano inicial não pode ser maior que o ano final!")
         return
     
-    # Gerar lista de anos selecionados
-    anos_selecionados = list(range(ano_inicio, ano_fim + 1))
-    
     # Mostrar anos selecionados
     anos_texto = f"📅 Período selecionado: {ano_inicio} - {ano_fim}"
     st.sidebar.markdown(f"<div style='text-align: center; padding: 10px; background-color: #000000; border-radius: 5px;'>{anos_texto}</div>", unsafe_allow_html=True)
-    # Filtrar livros
-    df_filtrado = filtrar_livros_por_anos(df_preparado, anos_selecionados)
-    print(df_filtrado['Ano de Publicação'])
+    sob_demanda = st.sidebar.toggle(
+        "Carregar abas sob demanda",
+        value=False,
+        key="abas_sob_demanda",
+        help="Calcula os gráficos de cada aba apenas quando ela é aberta. Recomendado para históricos grandes."
+    )
+    mostrar_linhas_tempo = st.sidebar.toggle(
+        "Linhas do tempo animadas",
+        value=False,
+        key="linhas_tempo",
+        help="Mostra a animação da leitura do período abaixo dos gráficos."
+    )
 
+    # Filtrar livros e calcular agregados (em cache por planilha e período)
+    agregados = calcular_agregados_livros(st.session_state.get('hash_livros'), ano_inicio, ano_fim, df)
 
-    
-    if df_filtrado.empty:
+    if agregados is None:
         st.warning("Nenhum livro encontrado no período selecionado.")
         return
     
     # Calcular e mostrar métricas
     metricas = {
-        'Total de Livros': len(df_filtrado),
-        'Total de Páginas': df_filtrado['Páginas'].sum() if 'Páginas' in df_filtrado.columns else 0,
-        'Média de Páginas por Livro': int(round(df_filtrado['Páginas'].mean(), 0)) if 'Páginas' in df_filtrado.columns else 0,
-        'Nota média': df_filtrado['Nota'].mean() if 'Nota' in df_filtrado.columns else 0
+        'Total de Livros': agregados['total_livros'],
+        'Total de Páginas': agregados['total_paginas'],
+        'Média de Páginas por Livro': int(round(agregados['media_paginas'], 0)),
+        'Nota média': agregados['media_nota']
     }
     #criar_cards_metricas(metricas)
     #criar_metricas_livros(df_filtrado)
     
     # Criar visualizações
-    criar_visualizacoes_livros(df_filtrado)
+    criar_visualizacoes_livros(agregados, sob_demanda=sob_demanda)
+
+    if mostrar_linhas_tempo:
+        orcamento_frames = st.sidebar.number_input(
+            "Máximo de frames das animações",
+            min_value=10,
+            max_value=2000,
+            value=ORCAMENTO_FRAMES,
+            step=10,
+            key="orcamento_frames",
+            help="Acima deste número, os livros são agrupados por dia, semana ou mês em cada frame."
+        )
+        df_periodo = filtrar_livros_por_anos(df, range(ano_inicio, ano_fim + 1))
+        criar_linha_tempo_leitura(df_periodo, orcamento_frames=orcamento_frames)
+
+        st.header("📈 Progressão de Notas")
+        incremental = st.checkbox(
+            "Animação leve da progressão",
+            value=False,
+            key="progressao_leve",
+            help="Envia cada livro uma única vez ao navegador. Indicado para históricos longos e conexões lentas."
+        )
+        criar_timeline_animada_combinada(df_periodo, incremental=incremental, orcamento_frames=orcamento_frames)
 
 
 def criar_cards_metricas(metricas):
@@ -1219,108 +1381,167 @@ def criar_cards_metricas(metricas):
             </div>
             """, unsafe_allow_html=True)
 
-def add_book_covers(df, title_column='Título'):
+def add_book_covers(df, title_column='Título', author_column='Autor'):
     """
-    Enhance an existing DataFrame by adding book cover images.
+    Enhance an existing DataFrame by adding book cover references.
+
+    As capas vão para o cache em disco de miniaturas (capas.buscar_capas_com_cache);
+    o DataFrame guarda só a chave de cada capa no cache, e a imagem é lida na
+    hora de exibir. Assim o frame continua leve e serializável.
     
     Args:
         df (pandas.DataFrame): Input DataFrame containing book titles
         title_column (str): Name of the column containing book titles
+        author_column (str): Nome da coluna de autores, usada na chave do cache
     
     Returns:
-        pandas.DataFrame: DataFrame with an added 'Book Cover' column
+        pandas.DataFrame: DataFrame with an added 'Book Cover' column (chave da
+        capa no cache, ou None se o livro não tiver capa)
     """
     # Create a copy of the DataFrame to avoid modifying the original
     enhanced_df = df.copy()
-    
-    # List to store book cover images
-    book_covers = []
-    
-    # API connection setup
-    conn = http.client.HTTPSConnection("hapi-books.p.rapidapi.com")
-    
-    headers = {
-        'x-rapidapi-key': "567a545e60msh8fecd6a13c95adbp106bacjsn41754a801cde",
-        'x-rapidapi-host': "hapi-books.p.rapidapi.com"
-    }
-    
-    # Process each book title
-    for title in df[title_column]:
-        try:
-            # Prepare the search query (replace spaces with +)
-            formatted_query = title.replace(" ", "+")
-            
-            # Make API request
-            conn.request("GET", f"/search/{formatted_query}", headers=headers)
-            res = conn.getresponse()
-            data = res.read().decode("utf-8")
-            
-            # Parse the JSON response
-            import json
-            book_data = json.loads(data)
-            
-            # Try to get the first book's cover
-            if book_data and len(book_data) > 0:
-                cover_url = book_data[0].get('cover')
-                
-                # Download book cover
-                if cover_url:
-                    response = requests.get(cover_url)
-                    if response.status_code == 200:
-                        # Open image with Pillow
-                        img = Image.open(BytesIO(response.content))
-                        book_covers.append(img)
-                        time.sleep(15)
-                    else:
-                        # If download fails, append None
-                        book_covers.append(None)
-                else:
-                    book_covers.append(None)
-            else:
-                book_covers.append(None)
-        
-        except Exception as e:
-            print(f"Error fetching cover for {title}: {e}")
-            book_covers.append(None)
-    
-    # Add book covers to the DataFrame
-    enhanced_df['Book Cover'] = book_covers
+
+    autores = df[author_column] if author_column in df.columns else [None] * len(df)
+    chaves = [chave_capa(title, autor) for title, autor in zip(df[title_column], autores)]
+    miniaturas = buscar_capas_com_cache(
+        (title, autor) for title, autor in zip(df[title_column], autores) if pd.notna(title)
+    )
+
+    # Add book cover references to the DataFrame
+    enhanced_df['Book Cover'] = [chave if miniaturas.get(chave) else None for chave in chaves]
     
     return enhanced_df
 
-def display_books_with_covers(enhanced_df):
+# Opções da galeria de capas
+LIVROS_POR_PAGINA = [12, 24, 48]
+COLUNAS_GALERIA = 6
+
+def _cartao_livro(livro, largura_capa):
+    """Mostra a capa de um livro da galeria com título, autor e nota."""
+    # A miniatura só é lida do cache aqui, e só para os livros da página visível.
+    # Sem a coluna 'Book Cover', a chave é calculada na hora a partir do título e autor
+    if 'Book Cover' in livro:
+        chave = livro['Book Cover']
+    else:
+        chave = chave_capa(livro.get('Título'), livro.get('Autor'))
+    miniatura = carregar_miniatura(chave)
+    if miniatura is not None:
+        st.image(miniatura, width=largura_capa)
+    else:
+        st.markdown(
+            f"<div style='width: {largura_capa}px; max-width: 100%; aspect-ratio: 2 / 3; display: flex; "
+            "align-items: center; justify-content: center; font-size: 40px; "
+            "background-color: #262730; border-radius: 5px;'>📕</div>",
+            unsafe_allow_html=True
+        )
+
+    legenda = f"**{livro.get('Título', '')}**"
+    if pd.notna(livro.get('Autor')):
+        legenda += f"  \n{livro['Autor']}"
+    if pd.notna(livro.get('Nota')):
+        legenda += f"  \n⭐ {livro['Nota']:g}"
+    st.caption(legenda)
+
+def mostrar_progresso_capas(busca):
+    """
+    Mostra o andamento da busca de capas em segundo plano. Só lê o progresso
+    da busca; nenhuma requisição é feita na thread da interface.
+
+    Args:
+        busca (capas.BuscaCapas | None): Busca da planilha ativa
     """
-    Display books with their covers in a Streamlit app.
+    if not busca_capas_habilitada():
+        st.warning("Busca de capas desativada: defina a variável de ambiente RAPIDAPI_KEY.")
+        return
+    if busca is None:
+        st.caption("As capas são buscadas em segundo plano depois que a planilha é carregada na página principal.")
+        return
+
+    progresso = busca.progresso()
+    resumo = (
+        f"{progresso['com_capa']} capas encontradas, {progresso['sem_capa']} livros sem capa"
+        + (f", {progresso['falhas']} falhas" if progresso['falhas'] else "")
+    )
+    if busca.ativa:
+        col_barra, col_botao = st.columns([4, 1])
+        with col_barra:
+            st.progress(
+                progresso['concluidos'] / max(progresso['total'], 1),
+                text=f"Buscando capas: {progresso['concluidos']} de {progresso['total']} livros ({resumo})"
+            )
+        with col_botao:
+            # Um clique só reexecuta a página, que lê o cache de novo
+            st.button("🔄 Atualizar", key="atualizar_capas")
+    elif progresso['falhas']:
+        col_resumo, col_botao = st.columns([4, 1])
+        with col_resumo:
+            st.caption(f"Busca de capas {progresso['estado']}: {resumo}.")
+        with col_botao:
+            # Novas buscas automáticas esperam um backoff; o botão reagenda na hora
+            st.button(
+                "🔁 Tentar de novo", key="tentar_capas_novamente",
+                on_click=reagendar_busca_capas, args=(busca.chave_planilha,)
+            )
+    else:
+        st.caption(f"Busca de capas {progresso['estado']}: {resumo}.")
+
+def display_books_with_covers(enhanced_df, largura_capa=LARGURA_MINIATURA, busca=None):
+    """
+    Mostra os livros em uma galeria de capas paginada.
+
+    Só a página visível é renderizada (no máximo o maior valor de
+    LIVROS_POR_PAGINA cartões, com uma capa e uma legenda cada), e só as
+    miniaturas dessa página são lidas do cache e enviadas ao navegador. O
+    custo de cada execução não depende do tamanho da biblioteca.
+
+    Sem a coluna 'Book Cover' (ver add_book_covers), as capas são procuradas no
+    cache pelo título e autor de cada livro visível; as que ainda não foram
+    baixadas aparecem como um marcador.
     
     Args:
-        enhanced_df (pandas.DataFrame): DataFrame with book covers
+        enhanced_df (pandas.DataFrame): DataFrame de livros, com ou sem a
+            coluna 'Book Cover'
+        largura_capa (int): Largura de cada capa na galeria, em pixels
+        busca (capas.BuscaCapas | None): Busca de capas em segundo plano cujo
+            progresso é mostrado acima da galeria
     """
-    st.title("Books with Covers")
+    st.header("📚 Capas dos livros")
+    mostrar_progresso_capas(busca)
     
-    # Ensure we have a Book Cover column
-    if 'Book Cover' not in enhanced_df.columns:
-        st.error("No book covers found. Please add covers first.")
+    if enhanced_df.empty:
+        st.info("Nenhum livro para mostrar.")
         return
-    
-    # Display books
-    for index, row in enhanced_df.iterrows():
-        col1, col2 = st.columns([1, 3])
-        
-        with col1:
-            # Display book cover
-            if row['Book Cover'] is not None:
-                st.image(row['Book Cover'], width=150)
-            else:
-                st.write("No cover available")
-        
-        with col2:
-            # Display book details
-            for column in enhanced_df.columns:
-                if column != 'Book Cover':
-                    st.write(f"{column}: {row[column]}")
-        
-        # Add a separator
-        st.markdown("---")
+
+    col_tamanho, col_pagina, col_info = st.columns([1, 1, 2])
+    with col_tamanho:
+        livros_por_pagina = st.selectbox(
+            "Livros por página", LIVROS_POR_PAGINA, index=1, key="galeria_livros_por_pagina"
+        )
+
+    total_paginas = math.ceil(len(enhanced_df) / livros_por_pagina)
+    # Ao aumentar o tamanho da página, a página atual pode deixar de existir
+    if st.session_state.get("galeria_pagina", 1) > total_paginas:
+        st.session_state["galeria_pagina"] = total_paginas
+
+    with col_pagina:
+        pagina = st.number_input(
+            "Página", min_value=1, max_value=total_paginas, step=1, key="galeria_pagina"
+        )
+
+    inicio = (pagina - 1) * livros_por_pagina
+    livros_pagina = enhanced_df.iloc[inicio:inicio + livros_por_pagina].to_dict('records')
+    with col_info:
+        st.markdown(
+            f"<div style='padding-top: 34px;'>Mostrando {inicio + 1}–{inicio + len(livros_pagina)} "
+            f"de {len(enhanced_df)} livros</div>",
+            unsafe_allow_html=True
+        )
+
+    for linha in range(0, len(livros_pagina), COLUNAS_GALERIA):
+        colunas = st.columns(COLUNAS_GALERIA)
+        for coluna, livro in zip(colunas, livros_pagina[linha:linha + COLUNAS_GALERIA]):
+            with coluna:
+                _cartao_livro(livro, largura_capa)
 
 
 
@@ -1346,7 +1567,9 @@ if df is not None:
         ]
  
         app_retrospectiva_leitura(df)
-        #df = add_book_covers(df)
+        # Só as capas que já estão no cache; a busca na rede roda em segundo
+        # plano, iniciada pela página principal ao carregar a planilha
+        display_books_with_covers(df, busca=obter_busca_capas(st.session_state.get('hash_livros')))
             # Verifica as colunas
         verificar_colunas(df, required_columns)
         
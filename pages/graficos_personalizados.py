@@ -3,39 +3,33 @@ import streamlit as st
 import pandas as pd
 import pygwalker as pyg
 from pygwalker.api.streamlit import StreamlitRenderer
+from modelo_dados import obter_dados
 
 def load_data():
     """
-    Carrega os dados do session_state.
+    Carrega uma cópia rasa dos dados preparados da planilha ativa; com o
+    copy-on-write do pandas 3, alterações feitas pela página ficam só nela.
     Retorna None se os dados não estiverem disponíveis.
     """
-    if 'df_livros' in st.session_state:
-        return st.session_state['df_livros']
-    else:
+    df = obter_dados()
+    if df is None:
         st.error("Por favor, carregue os dados na página principal primeiro.")
-        return None
+    return df
 
 def preparar_dados_para_graficos(df):
     """
     Prepara os dados para uso no criador de gráficos.
     
     Args:
-        df (pandas.DataFrame): DataFrame original
+        df (pandas.DataFrame): DataFrame preparado pelo modelo de dados
         
     Returns:
         pandas.DataFrame: DataFrame preparado para visualização
     """
     df_prep = df.copy()
     
-    # Tratamento de datas
-    df_prep['Conclusão'] = pd.to_datetime(df_prep['Conclusão'])
-    df_prep['Ano'] = df_prep['Conclusão'].dt.year
-    df_prep['Mês'] = df_prep['Conclusão'].dt.month
+    # Ano, Mês e Trimestre já vêm do modelo de dados
     df_prep['Mês_Nome'] = df_prep['Conclusão'].dt.strftime('%B')
-    df_prep['Trimestre'] = df_prep['Conclusão'].dt.quarter
-    
-    # Converter Ano de Publicação para numérico
-    df_prep['Ano de Publicação'] = pd.to_numeric(df_prep['Ano de Publicação'], errors='coerce')
     
     # Calcular métricas agregadas
     df_prep['Páginas_por_Mês'] = df_prep.groupby(['Ano', 'Mês'])['Páginas'].transform('sum')
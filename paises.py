@@ -0,0 +1,412 @@
+"""
+Resolução de nomes de países para códigos ISO 3166-1.
+
+Os nomes vêm da planilha em português (às vezes em inglês, com ou sem
+acentos). Na importação do módulo é montado um índice de apelidos com os
+nomes do pycountry (nome, nome oficial e nome comum, em inglês e nas
+traduções pt_BR/pt que acompanham o pacote) e com os mapeamentos especiais.
+Cada apelido é registrado na forma normalizada (maiúsculas, sem acentos nem
+pontuação) e com as palavras em ordem alfabética, de modo que "Coreia,
+República da" e "República da Coreia" caiam na mesma chave. Resolver um nome
+é uma consulta ao dicionário; a busca aproximada só roda, uma única vez e
+sobre as chaves do índice, quando a consulta falha.
+
+As resoluções completas (ISO-3, ISO-2 e continente) de cada nome bruto da
+coluna País, inclusive as que falharam, ficam gravadas em um cache JSON ao
+lado de country_coordinates.csv. Ele é lido no primeiro uso (partida quente)
+e descartado quando a versão do índice muda, de modo que um país já visto
+nunca repete a busca aproximada.
+"""
+import difflib
+import gettext
+import hashlib
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from importlib.metadata import version
+
+import pandas as pd
+import pycountry
+import pycountry_convert as pc
+import unidecode
+
+# Idiomas das traduções do pycountry usadas no índice, além do inglês
+IDIOMAS_TRADUCAO = ['pt_BR', 'pt']
+
+# Nomes que as traduções não cobrem ou que a busca aproximada confunde
+MAPEAMENTOS_ESPECIAIS = {
+    'RUSSIA': 'RUS',
+    'UNIAO SOVIETICA': 'SUN',
+    'ESTADOS UNIDOS': 'USA',
+    'EUA': 'USA',
+    'REINO UNIDO': 'GBR',
+    'INGLATERRA': 'GBR',
+    'ESCOCIA': 'GBR',
+    'PAIS DE GALES': 'GBR',
+    'IRLANDA DO NORTE': 'GBR',
+    'COREIA DO SUL': 'KOR',
+    'COREIA DO NORTE': 'PRK',
+    'REPUBLICA TCHECA': 'CZE',
+    'TCHECOSLOVAQUIA': 'CZE',
+    'ARABIA SAUDITA': 'SAU',
+    'EMIRADOS ARABES UNIDOS': 'ARE',
+    'REPUBLICA DOMINICANA': 'DOM',
+    'REPUBLICA DOMINICANA DA': 'DOM',
+    'HOLANDA': 'NLD',
+    'GERMANIA': 'DEU',
+    'MICRONESIA': 'FSM',
+    'VATICANO': 'VAT',
+    'PERSIA': 'IRN',
+    'IRA': 'IRN',
+    'SIRIA': 'SYR',
+    'BOLIVIA': 'BOL',
+    'TAIWAN': 'TWN',
+    'VIETNA': 'VNM',
+    'VENEZUELA': 'VEN',
+    'PALESTINA': 'PSE',
+}
+
+# Similaridade mínima aceita na busca aproximada
+CORTE_BUSCA_APROXIMADA = 0.8
+
+CONTINENTE_DESCONHECIDO = "Desconhecido"
+
+# Países que o pycountry_convert não associa a um continente
+CONTINENTES_ESPECIAIS = {
+    'SU': 'Europe',
+    'VA': 'Europe',
+    'TL': 'Asia',
+    'EH': 'Africa',
+    'SX': 'North America',
+}
+
+# Cache persistente das resoluções, ao lado de country_coordinates.csv
+CAMINHO_CACHE_RESOLUCOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "country_resolutions.json")
+
+
+def normalizar_nome(nome):
+    """
+    Normaliza um nome de país para consulta no índice: sem acentos, em
+    maiúsculas, com pontuação trocada por espaços e espaços repetidos removidos.
+
+    Args:
+        nome (str): Nome do país
+
+    Returns:
+        str: Nome normalizado
+    """
+    sem_acentos = unidecode.unidecode(str(nome)).upper()
+    return ' '.join(re.sub(r"[^A-Z0-9]+", ' ', sem_acentos).split())
+
+
+def _forma_ordenada(nome_normalizado):
+    """Retorna o nome normalizado com as palavras em ordem alfabética."""
+    return ' '.join(sorted(nome_normalizado.split()))
+
+
+def _nomes_pycountry():
+    """Gera pares (nome, alpha-3) com os nomes do pycountry e suas traduções."""
+    traducoes = []
+    for idioma in IDIOMAS_TRADUCAO:
+        try:
+            traducoes.append(gettext.translation('iso3166-1', pycountry.LOCALES_DIR, languages=[idioma]))
+        except OSError:
+            continue
+
+    for pais in pycountry.countries:
+        nomes = [pais.name, getattr(pais, 'official_name', None), getattr(pais, 'common_name', None)]
+        for nome in filter(None, nomes):
+            yield nome, pais.alpha_3
+            for traducao in traducoes:
+                yield traducao.gettext(nome), pais.alpha_3
+
+
+def _construir_indice():
+    """
+    Monta o índice de apelidos normalizados → alpha-3. Os mapeamentos especiais
+    têm prioridade; entre os nomes do pycountry, vale o primeiro registrado.
+    """
+    indice = {}
+
+    def registrar(nome, codigo):
+        normalizado = normalizar_nome(nome)
+        if normalizado:
+            indice.setdefault(normalizado, codigo)
+            indice.setdefault(_forma_ordenada(normalizado), codigo)
+
+    for nome, codigo in MAPEAMENTOS_ESPECIAIS.items():
+        registrar(nome, codigo)
+    for nome, codigo in _nomes_pycountry():
+        registrar(nome, codigo)
+    return indice
+
+
+INDICE_PAISES = _construir_indice()
+CHAVES_INDICE = list(INDICE_PAISES)
+
+
+def get_flag_emoji(country_code):
+    """
+    Convert a two-letter country code to a flag emoji.
+
+    Args:
+        country_code (str): Two-letter country code (ISO 3166-1 alpha-2)
+
+    Returns:
+        str: Flag emoji for the country code, or empty string if input is invalid
+    """
+    country_code = country_code.upper()
+    return ''.join(chr(ord(c) + 127397) for c in country_code)
+
+
+# Tabelas constantes ISO-3 → ISO-2 e ISO-3 → bandeira, montadas uma única vez.
+# Países históricos (ex.: SUN) entram na conversão, mas não têm bandeira
+ISO3_PARA_ISO2 = {pais.alpha_3: pais.alpha_2 for pais in pycountry.historic_countries}
+ISO3_PARA_ISO2.update({pais.alpha_3: pais.alpha_2 for pais in pycountry.countries})
+BANDEIRAS_ISO3 = {pais.alpha_3: get_flag_emoji(pais.alpha_2) for pais in pycountry.countries}
+
+
+@lru_cache(maxsize=1024)
+def obter_codigo_iso(pais):
+    """
+    Obtém o código ISO alpha-3 de um país, lidando com variações de nome.
+
+    Args:
+        pais (str): Nome do país (em português ou inglês)
+
+    Returns:
+        str: Código ISO alpha-3 do país ou None se não encontrado
+    """
+    if not isinstance(pais, str):
+        return None
+    normalizado = normalizar_nome(pais)
+    if not normalizado:
+        return None
+
+    codigo = INDICE_PAISES.get(normalizado) or INDICE_PAISES.get(_forma_ordenada(normalizado))
+    if codigo:
+        return codigo
+
+    # Última tentativa: uma única busca aproximada sobre as chaves do índice
+    parecidos = difflib.get_close_matches(normalizado, CHAVES_INDICE, n=1, cutoff=CORTE_BUSCA_APROXIMADA)
+    if parecidos:
+        return INDICE_PAISES[parecidos[0]]
+
+    print(f"Código ISO não encontrado para: {pais}")
+    return None
+
+
+def obter_codigo_iso2(codigo_iso3):
+    """
+    Converte um código ISO alpha-3 em alpha-2, incluindo países históricos.
+
+    Args:
+        codigo_iso3 (str): Código ISO alpha-3
+
+    Returns:
+        str: Código ISO alpha-2 ou None se não encontrado
+    """
+    if not codigo_iso3:
+        return None
+    return ISO3_PARA_ISO2.get(codigo_iso3.upper())
+
+
+def get_flag_emoji_from_iso3(iso3_code):
+    """
+    Return the flag emoji for an ISO 3166-1 alpha-3 code.
+
+    Args:
+        iso3_code (str): Three-letter country code
+
+    Returns:
+        str: Flag emoji, or empty string if the code is unknown
+    """
+    if not isinstance(iso3_code, str):
+        return ''
+    return BANDEIRAS_ISO3.get(iso3_code.upper(), '')
+
+
+def add_flag_emoji_column(df, country_code_column):
+    """
+    Add a new column with flag emojis based on ISO alpha-3 country codes.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame
+        country_code_column (str): Name of the column containing country codes
+
+    Returns:
+        pd.DataFrame: DataFrame with new 'flag' column
+    """
+    result = df.copy()
+    # Um único map sobre a tabela constante, sem chamada Python por linha
+    result['flag'] = result[country_code_column].map(BANDEIRAS_ISO3).fillna('')
+    return result
+
+
+def obter_continente(codigo_iso2):
+    """
+    Retorna o continente de um país a partir do seu código ISO alpha-2.
+
+    Args:
+        codigo_iso2 (str): Código ISO alpha-2
+
+    Returns:
+        str: Nome do continente (em inglês) ou "Desconhecido"
+    """
+    if not codigo_iso2:
+        return CONTINENTE_DESCONHECIDO
+    if codigo_iso2 in CONTINENTES_ESPECIAIS:
+        return CONTINENTES_ESPECIAIS[codigo_iso2]
+    try:
+        return pc.convert_continent_code_to_continent_name(pc.country_alpha2_to_continent_code(codigo_iso2))
+    except KeyError:
+        return CONTINENTE_DESCONHECIDO
+
+
+def _versao_indice():
+    """
+    Identifica a versão do índice: muda quando o pycountry é atualizado ou
+    quando os mapeamentos do módulo são alterados, invalidando o cache em disco.
+    """
+    conteudo = json.dumps(
+        [version('pycountry'), MAPEAMENTOS_ESPECIAIS, CONTINENTES_ESPECIAIS, CORTE_BUSCA_APROXIMADA],
+        sort_keys=True
+    )
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()[:16]
+
+
+VERSAO_INDICE = _versao_indice()
+
+_resolucoes = None
+_trava_resolucoes = threading.Lock()
+
+
+def _carregar_resolucoes():
+    """Lê o cache de resoluções do disco, descartando-o se for de outra versão do índice."""
+    try:
+        with open(CAMINHO_CACHE_RESOLUCOES, encoding='utf-8') as arquivo:
+            conteudo = json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+    if conteudo.get('versao') != VERSAO_INDICE:
+        return {}
+    return conteudo.get('paises', {})
+
+
+def _gravar_resolucoes(resolucoes):
+    """Grava o cache em um arquivo temporário e o renomeia, para nunca deixá-lo incompleto."""
+    temporario = f"{CAMINHO_CACHE_RESOLUCOES}.{os.getpid()}.tmp"
+    try:
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'versao': VERSAO_INDICE, 'paises': resolucoes}, arquivo, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temporario, CAMINHO_CACHE_RESOLUCOES)
+    except OSError as e:
+        print(f"Não foi possível gravar o cache de países: {e}")
+
+
+def _resolver_nome(pais):
+    """Resolve um único nome, sem consultar o cache persistente."""
+    codigo_iso3 = obter_codigo_iso(pais)
+    codigo_iso2 = obter_codigo_iso2(codigo_iso3)
+    return {
+        'iso3': codigo_iso3,
+        'iso2': codigo_iso2,
+        'continente': obter_continente(codigo_iso2)
+    }
+
+
+def resolver_paises(paises):
+    """
+    Resolve de uma vez um conjunto de nomes de países em código ISO-3, código
+    ISO-2 e continente. Nomes repetidos são resolvidos uma única vez, os já
+    conhecidos vêm do cache persistente e o cache é gravado no máximo uma vez,
+    só se houver nomes novos (inclusive os que falharem).
+
+    Args:
+        paises (Iterable[str]): Nomes de países como aparecem na planilha
+
+    Returns:
+        dict[str, dict]: Para cada nome, um dicionário com as chaves 'iso3',
+        'iso2' e 'continente'
+    """
+    global _resolucoes
+    nomes = {str(pais): pais for pais in paises}
+    with _trava_resolucoes:
+        if _resolucoes is None:
+            _resolucoes = _carregar_resolucoes()
+        novos = {chave: _resolver_nome(pais) for chave, pais in nomes.items() if chave not in _resolucoes}
+        if novos:
+            _resolucoes.update(novos)
+            _gravar_resolucoes(_resolucoes)
+        return {chave: _resolucoes[chave] for chave in nomes}
+
+
+def resolver_pais(pais):
+    """
+    Resolve um nome de país em código ISO-3, código ISO-2 e continente,
+    consultando primeiro o cache persistente. Resoluções novas (inclusive
+    as que falham) são gravadas no cache.
+
+    Args:
+        pais (str): Nome do país como aparece na planilha
+
+    Returns:
+        dict: Dicionário com as chaves 'iso3', 'iso2' e 'continente'
+    """
+    return resolver_paises([pais])[str(pais)]
+
+
+def adicionar_colunas_paises(df, coluna='País'):
+    """
+    Adiciona as colunas 'Codigo_ISO' e 'Continente' a um DataFrame,
+    resolvendo em lote os nomes distintos da coluna de país e juntando o
+    resultado de volta com um map vetorizado.
+
+    Args:
+        df (pandas.DataFrame): DataFrame com a coluna de país
+        coluna (str): Nome da coluna de país
+
+    Returns:
+        pandas.DataFrame: Cópia com as colunas 'Codigo_ISO' e 'Continente'
+        (nulas onde o país está vazio)
+    """
+    resultado = df.copy()
+    resolucoes = resolver_paises(pd.unique(resultado[coluna].dropna()))
+    codigos = {nome: resolucao['iso3'] for nome, resolucao in resolucoes.items()}
+    continentes = {nome: resolucao['continente'] for nome, resolucao in resolucoes.items()}
+    # Em colunas categóricas o map percorre só as categorias
+    resultado['Codigo_ISO'] = resultado[coluna].map(codigos).astype('category')
+    resultado['Continente'] = resultado[coluna].map(continentes).astype('category')
+    return resultado
+
+
+def paises_nao_resolvidos(paises):
+    """
+    Lista, entre os nomes informados (por exemplo os da planilha ativa), os que
+    não puderam ser resolvidos. Os nomes passam por resolver_paises, então vêm
+    do cache persistente ou, depois de invalidar_cache_resolucoes, são
+    resolvidos de novo.
+
+    Args:
+        paises (Iterable[str]): Nomes de países como aparecem na planilha
+
+    Returns:
+        list[str]: Nomes sem código ISO, em ordem alfabética
+    """
+    nomes = pd.Series(list(paises), dtype=object).dropna().unique()
+    resolucoes = resolver_paises(nomes)
+    return sorted(nome for nome, resolucao in resolucoes.items() if resolucao['iso3'] is None)
+
+
+def invalidar_cache_resolucoes():
+    """Apaga o cache de resoluções, em memória e em disco, forçando uma nova resolução."""
+    global _resolucoes
+    with _trava_resolucoes:
+        _resolucoes = {}
+        obter_codigo_iso.cache_clear()
+        try:
+            os.remove(CAMINHO_CACHE_RESOLUCOES)
+        except FileNotFoundError:
+            pass